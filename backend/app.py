@@ -1,10 +1,34 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from routes.user_routes import router as user_router
 from routes.auth_routes import router as auth_router
+from routes.health_routes import router as health_router
+from utils.llm import close_llm_client
+from utils.cache import close_cache
+from utils.embedding_executor import embedding_executor
+from utils.bm25_index import insights_index
+from utils.warmup import warm_up
+from utils.responses import FastJSONResponse, GZIP_MIN_SIZE, GZIP_LEVEL
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Preload models and stores in the background; /health/ready reports when it is done
+    warmup_task = asyncio.create_task(warm_up())
+    yield
+    warmup_task.cancel()
+    # Persist a pending BM25 index save, release the pooled LLM and Redis connections and stop
+    # the embedding workers on shutdown
+    await insights_index.flush()
+    await close_llm_client()
+    await close_cache()
+    embedding_executor.shutdown()
 
 def create_app():
-    app = FastAPI(title="Smart Placements Assistance")
+    # orjson-encoded responses for every route that returns plain data
+    app = FastAPI(title="Smart Placements Assistance", lifespan=lifespan, default_response_class=FastJSONResponse)
     
     # Add CORS middleware
     app.add_middleware(
@@ -13,8 +37,13 @@ def create_app():
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Total-Count", "ETag"],
     )
+
+    # Compress large JSON bodies (event streams are excluded by the middleware)
+    app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE, compresslevel=GZIP_LEVEL)
     
     app.include_router(user_router)
     app.include_router(auth_router)
+    app.include_router(health_router)
     return app
\ No newline at end of file
@@ -0,0 +1,65 @@
+# Benchmark: company-name resolution per query against a synthetic index of company names.
+# Every query is resolved from scratch (the query analysis cache is bypassed); the run fails if a
+# query resolves to something other than the expected company.
+# Run from the backend folder: python -m benchmarks.bench_company_resolver [names]
+import random
+import sys
+import time
+from services.chatbot_service import PLACEMENT_KEYWORDS
+from utils.company_resolver import CompanyResolver
+
+WORDS = [
+    "global", "data", "soft", "net", "info", "micro", "digital", "cloud", "smart", "tech", "first", "bharat",
+    "united", "national", "capital", "finance", "energy", "motors", "power", "steel", "health", "pharma",
+    "media", "logic", "matrix", "quantum", "vertex", "apex", "nova", "prime", "star", "wave", "bridge",
+    "analytics", "networks", "dynamics", "ventures", "partners", "works", "edge", "stack", "mind", "sys",
+]
+SUFFIXES = ["", " Technologies", " Solutions", " Systems", " Labs", " Pvt Ltd", " India", " Consulting"]
+KNOWN = ["Tata Consultancy Services", "Infosys Limited", "Amazon", "Goldman Sachs", "Zoho Corporation"]
+
+EXPECTED = [
+    ("What is the TCS package for 2024?", None),
+    ("What is the Tata Consultancy Services package for 2024?", "Tata Consultancy Services"),
+    ("How many rounds are there in the Infosys interview process?", "Infosys Limited"),
+    ("Tell me about the infosis hiring process", "Infosys Limited"),
+    ("Did amazn visit campus last year?", "Amazon"),
+    ("goldman sachs highest package", "Goldman Sachs"),
+    ("Which companies visited campus in 2024?", None),
+    ("What is the highest package offered to CSE students?", None),
+    ("What is the weather like today in the city?", None),
+    ("Can you share the average package and eligibility criteria for the summer internship drive?", None),
+]
+
+def synthetic_names(count: int) -> list[str]:
+    random.seed(11)
+    names = set(KNOWN)
+    while len(names) < count:
+        word = " ".join(random.choice(WORDS).capitalize() for _ in range(random.randint(1, 3)))
+        names.add(word + random.choice(SUFFIXES))
+    return sorted(names)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 800
+    resolver = CompanyResolver()
+    resolver.set_keywords(PLACEMENT_KEYWORDS)
+    resolver.add("stats", [{"company_name": name} for name in synthetic_names(count)])
+    resolver.refresh()
+    print(f"{count} company names, best of 5 runs of 200 resolutions per query")
+    print(f"{'query':<64} {'resolved':<28} {'us/query':>9}")
+    mismatches = 0
+    for query, expected in EXPECTED:
+        company, _ = resolver.resolve(query)
+        best = float("inf")
+        for _ in range(5):
+            started = time.perf_counter()
+            for _ in range(200):
+                resolver.resolve(query)
+            best = min(best, (time.perf_counter() - started) / 200)
+        flag = "" if company == expected else f"  MISMATCH (expected {expected})"
+        mismatches += company != expected
+        print(f"{query[:63]:<64} {str(company):<28} {best * 1e6:>9.1f}{flag}")
+    if mismatches:
+        raise SystemExit(f"{mismatches} mismatch(es)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Benchmark: columnar company stats snapshot vs. Python loops over metadata dicts
+# Run from the backend folder: python -m benchmarks.bench_company_snapshot [rows]
+import random
+import sys
+import time
+from collections import defaultdict
+from utils.company_stats_snapshot import CompanyStatsSnapshot, BRANCHES
+
+def synthetic_rows(count: int):
+    random.seed(7)
+    ids, metadatas = [], []
+    for index in range(count):
+        metadata = {
+            "company_name": f"COMPANY{index % 5000}",
+            "year": random.randint(2015, 2025),
+            "total_offers": random.randint(0, 200),
+            **{branch: random.randint(0, 20) for branch in BRANCHES},
+        }
+        if random.random() < 0.9:
+            metadata["salary"] = round(random.uniform(3, 45), 2)
+        if random.random() < 0.5:
+            metadata["internship_ppo"] = random.randint(0, 10)
+        ids.append(f"id-{index}")
+        metadatas.append(metadata)
+    return ids, metadatas
+
+# Loop versions of the same queries, as they would be written over collection.get() output
+def loop_top_companies(metadatas, n, year):
+    rows = [m for m in metadatas if m.get("year") == year and m.get("salary") is not None]
+    return sorted(rows, key=lambda m: m["salary"], reverse=True)[:n]
+
+def loop_branch_totals(metadatas):
+    totals = defaultdict(lambda: defaultdict(int))
+    for m in metadatas:
+        for branch in BRANCHES:
+            totals[m["year"]][branch] += m.get(branch, 0)
+    return totals
+
+def loop_percentiles(metadatas, percentiles):
+    salaries = sorted(m["salary"] for m in metadatas if m.get("salary") is not None)
+    return [salaries[min(len(salaries) - 1, int(p / 100 * len(salaries)))] for p in percentiles]
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    ids, metadatas = synthetic_rows(count)
+    snapshot = CompanyStatsSnapshot()
+    build_ms = timed(lambda: snapshot.load(ids, metadatas), repeat=1)
+    print(f"rows: {count:,}   snapshot build: {build_ms:.1f} ms")
+    print(f"{'query':<28}{'loops (ms)':>12}{'snapshot (ms)':>15}{'speedup':>10}")
+    cases = [
+        ("top 10 by salary (2024)", lambda: loop_top_companies(metadatas, 10, 2024), lambda: snapshot.top_companies(10, "salary", 2024)),
+        ("branch offers per year", lambda: loop_branch_totals(metadatas), lambda: snapshot.branch_offer_totals()),
+        ("salary percentiles", lambda: loop_percentiles(metadatas, [25, 50, 75, 90]), lambda: snapshot.salary_percentiles([25, 50, 75, 90])),
+    ]
+    for name, loop_fn, snapshot_fn in cases:
+        loop_ms, snapshot_ms = timed(loop_fn), timed(snapshot_fn)
+        print(f"{name:<28}{loop_ms:>12.2f}{snapshot_ms:>15.2f}{loop_ms / snapshot_ms:>9.1f}x")
+    patch_ms = timed(lambda: snapshot.add([f"new-{time.perf_counter_ns()}"], [metadatas[0]]), repeat=100)
+    print(f"single-row patch: {patch_ms:.3f} ms")
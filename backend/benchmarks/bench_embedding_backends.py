@@ -0,0 +1,54 @@
+# Benchmark: encode latency, throughput and recall drift of the embedding backends
+# Recall drift is the overlap of each backend's top-k neighbours with the full-precision model's.
+# Backends whose dependencies are missing are skipped.
+# Run from the backend folder: python -m benchmarks.bench_embedding_backends [documents] [queries]
+import sys
+import time
+import numpy as np
+from utils.embedding_model import BACKENDS, create_embedding_backend
+from benchmarks.bench_hybrid_retrieval import synthetic_corpus
+
+def normalized(matrix) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+def top_k(documents: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-(queries @ documents.T), axis=1)[:, :k]
+
+def run(document_count: int, query_count: int, k: int = 5):
+    _, documents, metadatas = synthetic_corpus(max(1, document_count // 3))
+    documents = documents[:document_count]
+    queries = [
+        f"What is the package for {metadata['roles']} at {metadata['company_name']}?"
+        for metadata in metadatas[:query_count]
+    ]
+    reference = None
+    print(f"documents: {len(documents):,}   queries: {len(queries)}   k: {k}")
+    print(f"{'backend':<40}{'load (s)':>10}{'query (ms)':>12}{'docs/s':>10}{'recall vs fp32':>16}")
+    for name in BACKENDS:
+        try:
+            started = time.perf_counter()
+            backend = create_embedding_backend(name)
+            load_s = time.perf_counter() - started
+        except Exception as e:
+            print(f"{name:<40}skipped ({type(e).__name__}: {e})")
+            continue
+        backend.encode(queries[:2])
+        started = time.perf_counter()
+        for query in queries:
+            backend.encode(query)
+        query_ms = (time.perf_counter() - started) / len(queries) * 1000
+        started = time.perf_counter()
+        document_vectors = normalized(backend.encode(documents, batch_size=64))
+        throughput = len(documents) / (time.perf_counter() - started)
+        neighbours = top_k(document_vectors, normalized(backend.encode(queries)), k)
+        if name == "sentence-transformers":
+            reference = neighbours
+        recall = "n/a" if reference is None else f"{np.mean([len(set(a) & set(b)) / k for a, b in zip(neighbours, reference)]):.3f}"
+        print(f"{backend.identity:<40}{load_s:>10.2f}{query_ms:>12.2f}{throughput:>10.0f}{recall:>16}")
+
+if __name__ == "__main__":
+    document_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    run(document_count, query_count)
@@ -0,0 +1,77 @@
+# Benchmark: recall@k and latency of vector-only vs. hybrid (vector + BM25, RRF) insights retrieval
+# Uses the configured embedding model and an in-memory Chroma collection; the app's data is untouched.
+# Run from the backend folder: python -m benchmarks.bench_hybrid_retrieval [companies] [queries]
+import asyncio
+import random
+import sys
+import tempfile
+import time
+import chromadb
+from utils.bm25_index import BM25Index
+from utils.embedding_model import get_embedding_model
+from utils.hybrid_retrieval import hybrid_search
+
+ROLES = ["Software Engineer", "Data Analyst", "ML Engineer", "DevOps Engineer", "QA Engineer",
+         "Product Analyst", "Frontend Developer", "Backend Developer", "Cloud Engineer", "SDE Intern"]
+SYLLABLES = ["zo", "ka", "tri", "ven", "lo", "mex", "qu", "ra", "dyn", "sol", "pix", "nu", "tek", "vo"]
+
+def synthetic_corpus(companies: int):
+    random.seed(5)
+    ids, documents, metadatas = [], [], []
+    names = set()
+    while len(names) < companies:
+        names.add("".join(random.sample(SYLLABLES, 3)).capitalize() + random.choice([" Labs", " Systems", " Tech", ""]))
+    for name in sorted(names):
+        for role in random.sample(ROLES, 3):
+            package = f"{random.randint(4, 40)} LPA"
+            ppo = random.choice(["PPO offered after internship", "No PPO"])
+            ids.append(f"doc-{len(ids)}")
+            documents.append(
+                f"Hiring for {role}\nCompany Name: {name}\nCompany Description: Product company\n"
+                f"Role: {role}\nJob Description: Build and ship features. {ppo}\nPackage: {package}\n"
+                f"Hiring Process:\nRound 1: Aptitude\nRound 2: Technical\nRound 3: HR"
+            )
+            metadatas.append({"company_name": name, "roles": role})
+    return ids, documents, metadatas
+
+async def run(companies: int, queries: int, k: int = 5):
+    ids, documents, metadatas = synthetic_corpus(companies)
+    model = get_embedding_model()
+    embeddings = model.encode(documents, batch_size=64).tolist()
+    client = chromadb.EphemeralClient()
+    collection = client.get_or_create_collection(f"bench_insights_{time.time_ns()}")
+    for start in range(0, len(ids), 1000):
+        end = start + 1000
+        collection.add(ids=ids[start:end], documents=documents[start:end],
+                       metadatas=metadatas[start:end], embeddings=embeddings[start:end])
+    index = BM25Index(collection, f"{tempfile.mkdtemp()}/bm25.json")
+    await index.ensure_loaded()
+
+    random.seed(9)
+    targets = random.sample(range(len(ids)), min(queries, len(ids)))
+    vector_hits = hybrid_hits = 0
+    vector_time = hybrid_time = 0.0
+    for target in targets:
+        query = f"What is the package for {metadatas[target]['roles']} at {metadatas[target]['company_name']}?"
+        embedding = model.encode(query).tolist()
+
+        started = time.perf_counter()
+        dense = collection.query(query_embeddings=[embedding], n_results=k, include=[])
+        vector_time += time.perf_counter() - started
+        vector_hits += ids[target] in dense["ids"][0]
+
+        started = time.perf_counter()
+        hits = await hybrid_search(query, embedding, k, collection=collection, index=index)
+        hybrid_time += time.perf_counter() - started
+        hybrid_hits += ids[target] in [hit["id"] for hit in hits]
+
+    count = len(targets)
+    print(f"documents: {len(ids):,}   queries: {count}   k: {k}")
+    print(f"{'retrieval':<14}{'recall@k':>10}{'mean latency (ms)':>20}")
+    print(f"{'vector only':<14}{vector_hits / count:>10.3f}{vector_time / count * 1000:>20.2f}")
+    print(f"{'hybrid (RRF)':<14}{hybrid_hits / count:>10.3f}{hybrid_time / count * 1000:>20.2f}")
+
+if __name__ == "__main__":
+    companies = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    asyncio.run(run(companies, queries))
@@ -0,0 +1,78 @@
+# Intent classifier check and micro-benchmark against the previous substring loops.
+# The table of expected intents is the point: the run fails if the classifier disagrees with it.
+# The old short-circuit loop is faster, but mostly because "hi" matches inside words like "which"
+# and it returns early with a greeting; query analyses are cached per distinct query anyway.
+# Run from the backend folder: python -m benchmarks.bench_intent
+import timeit
+from services.chatbot_service import GREETING_RESPONSES, PLACEMENT_KEYWORDS, intent_classifier
+
+EXPECTED = [
+    ("hi", "greeting"),
+    ("Good morning!", "greeting"),
+    ("Which companies visited campus in 2024?", "placement"),
+    ("How many rounds are there in the TCS interview process?", "placement"),
+    ("What is the highest package offered to CSE students?", "placement"),
+    ("Tell me about three HR rounds at Infosys", "placement"),
+    ("What is the weather like today?", "unknown"),
+    ("Can you share the average package and eligibility criteria for Amazon internship?", "placement"),
+    ("who won the cricket match yesterday", "unknown"),
+    ("hey, what's the stipend for the Google summer internship and is there a PPO conversion?", "placement"),
+    ("Tell me about the placements", "placement"),
+    ("how many offers did students get", "placement"),
+    ("Which packages do the off-campus drives offer?", "placement"),
+    ("Hiring trends this year", "placement"),
+    ("which one is better", "unknown"),
+    ("What's up", "greeting"),
+]
+QUERIES = [query for query, _ in EXPECTED]
+
+# Previous implementation, kept here only for comparison
+def legacy_greeting(query):
+    lower_query = query.strip().lower()
+    for greet, response in GREETING_RESPONSES.items():
+        if greet in lower_query:
+            return response
+    return None
+
+def legacy_keywords(query):
+    lower_query = query.lower()
+    return any(keyword in lower_query for keyword in PLACEMENT_KEYWORDS)
+
+# Substring loops producing the same output as classify(): the greeting plus every matched keyword
+def legacy_full(query):
+    greeting = legacy_greeting(query)
+    lower_query = query.lower()
+    return greeting, [keyword for keyword in PLACEMENT_KEYWORDS if keyword in lower_query]
+
+def run_legacy_full():
+    for query in QUERIES:
+        legacy_full(query)
+
+def run_legacy():
+    for query in QUERIES:
+        if legacy_greeting(query) is None:
+            legacy_keywords(query)
+
+def run_compiled():
+    for query in QUERIES:
+        intent_classifier.classify(query)
+
+if __name__ == "__main__":
+    rounds = 20000
+    for name, fn in (
+        ("legacy loops (short-circuit)", run_legacy),
+        ("legacy loops (all keywords)", run_legacy_full),
+        ("compiled classifier", run_compiled),
+    ):
+        seconds = min(timeit.repeat(fn, number=rounds, repeat=3))
+        print(f"{name:>29}: {rounds * len(QUERIES) / seconds:,.0f} queries/sec")
+    print()
+    print(f"{'query':<60} {'expected':<10} {'legacy':<10} compiled")
+    mismatches = 0
+    for query, expected in EXPECTED:
+        legacy = "greeting" if legacy_greeting(query) else ("placement" if legacy_keywords(query) else "unknown")
+        intent = intent_classifier.classify(query).intent
+        mismatches += intent != expected
+        print(f"{query[:58]:<60} {expected:<10} {legacy:<10} {intent}{'' if intent == expected else '  <-- MISMATCH'}")
+    if mismatches:
+        raise SystemExit(f"{mismatches} unexpected intent(s)")
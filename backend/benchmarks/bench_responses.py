@@ -0,0 +1,55 @@
+# Benchmark: JSON encoding and payload size of list responses
+# (FastAPI's default JSONResponse path vs. the orjson response layer, raw vs. gzip)
+# Run from the backend folder: python -m benchmarks.bench_responses [rows ...]
+import gzip
+import json
+import random
+import sys
+import time
+from fastapi.encoders import jsonable_encoder
+from utils.responses import dumps, iter_json_list, GZIP_LEVEL
+from utils.company_stats_snapshot import BRANCHES
+
+def synthetic_company_rows(count: int):
+    random.seed(11)
+    return [
+        {
+            "id": f"{index:08x}-5f1c-4d8e-9a3b-{index:012x}",
+            "company_name": f"COMPANY {index % 900}",
+            "year": random.randint(2015, 2025),
+            "salary": round(random.uniform(3, 45), 2),
+            "internship_ppo": random.randint(0, 10),
+            "total_offers": random.randint(0, 200),
+            **{branch: random.randint(0, 20) for branch in BRANCHES},
+        }
+        for index in range(count)
+    ]
+
+# What a route returning plain data costs by default: jsonable_encoder, then json.dumps
+def default_encode(rows) -> bytes:
+    return json.dumps(jsonable_encoder(rows), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+def streamed_encode(rows) -> bytes:
+    return b"".join(iter_json_list(rows))
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [1_000, 5_000, 20_000]
+    print(f"{'rows':>8}{'default (ms)':>14}{'orjson (ms)':>13}{'streamed (ms)':>15}{'speedup':>9}"
+          f"{'raw (KB)':>10}{'gzip (KB)':>11}{'gzip (ms)':>11}")
+    for count in counts:
+        rows = synthetic_company_rows(count)
+        default_ms, default_body = timed(lambda: default_encode(rows))
+        orjson_ms, body = timed(lambda: dumps(rows))
+        streamed_ms, streamed_body = timed(lambda: streamed_encode(rows))
+        assert json.loads(body) == json.loads(default_body) == json.loads(streamed_body)
+        gzip_ms, compressed = timed(lambda: gzip.compress(body, compresslevel=GZIP_LEVEL))
+        print(f"{count:>8,}{default_ms:>14.2f}{orjson_ms:>13.2f}{streamed_ms:>15.2f}{default_ms / orjson_ms:>8.1f}x"
+              f"{len(body) / 1024:>10.1f}{len(compressed) / 1024:>11.1f}{gzip_ms:>11.2f}")
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, Query, HTTPException
+from fastapi.responses import StreamingResponse
 from typing import List
+import json
 from models.chatbot_model import ChatbotModel
-from services.chatbot_service import ( get_chatbot_answer )
+from services.chatbot_service import ( get_chatbot_answer, stream_chatbot_answer, get_chatbot_stats )
 
 router = APIRouter()
 
@@ -14,4 +16,24 @@ async def fetch_chatbot_response(query: str):
         res = await get_chatbot_answer(query)
         return res
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching answer: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error fetching answer: {str(e)}")
+
+# Stream Chatbot Answer as Server-Sent Events
+@router.get("/stream-chatbot-answer")
+async def stream_chatbot_response(query: str):
+    async def event_stream():
+        try:
+            async for event, data in stream_chatbot_answer(query):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': f'Error fetching answer: {str(e)}'})}\n\n"
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Get Chatbot Runtime Statistics (LLM pool and queue)
+@router.get("/stats")
+async def fetch_chatbot_stats():
+    return get_chatbot_stats()
@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Query, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, Query, HTTPException, Depends, Request
+from typing import List, Literal
 from models.chatbot_model import ChatbotModel
+from models.bulk_delete_model import BulkDeleteModel
 from services.company_insights_service import (
-    getAllCompanyInsights, addCompanyInsightsData, addCompanyInsights, deleteCompanyInsightsData,deleteAllCompanyInsightsData
+    getAllCompanyInsights, addCompanyInsightsData, addCompanyInsights, deleteCompanyInsightsData,deleteAllCompanyInsightsData,
+    exportCompanyInsights, bulkDeleteCompanyInsightsData
 )
 from utils.auth_utils import verify_token
+from utils.listing import page_params
+from utils.versioning import versioned_get
+from utils.tabular_export import export_response
+from utils.responses import json_response, bulk_write_status
+from database import company_insights_collection
 
 router = APIRouter()    
 
@@ -12,14 +19,34 @@ router = APIRouter()
 
 # Get Company Insights/Chatbot Data
 @router.get("/get-company-insights-data")
-async def get_company_insights_data(company_name: str = Query(None)):
+async def get_company_insights_data(
+    request: Request,
+    company_name: str = Query(None),
+    page: dict = Depends(page_params)
+):
     filters = {"company_name": company_name} if company_name else {}
     try:
-        data = await getAllCompanyInsights(filters)
-        return data
+        return await versioned_get(
+            request, company_insights_collection.name, [filters, page],
+            lambda: getAllCompanyInsights(filters, page)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching data: {str(e)}")
 
+# Export all Company Insights/Chatbot role records as NDJSON or CSV, streamed page by page
+# (one line/row per stored role, with its document and optionally its embedding)
+@router.get("/export-company-insights-data")
+async def export_company_insights_data(
+    company_name: str = Query(None),
+    include_embeddings: bool = Query(False),
+    format: Literal["ndjson", "csv"] = Query("ndjson")
+):
+    try:
+        pages, columns = exportCompanyInsights(company_name, include_embeddings)
+        return export_response(pages, format, columns, "company_insights")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exporting data: {str(e)}")
+
 # Add Company Insights/Chatbot Record
 @router.post("/add-company-insights-data")
 async def add_company_insights_data(data: ChatbotModel,token: None=Depends(verify_token)):
@@ -31,10 +58,14 @@ async def add_company_insights_data(data: ChatbotModel,token: None=Depends(verif
     
 # Add bulk Company Insights/Chatbot Data at a time
 @router.post("/add-all-company-insights-data")
-async def add_all_company_insights_data(data_list: List[ChatbotModel],token: None=Depends(verify_token)):
+async def add_all_company_insights_data(
+    data_list: List[ChatbotModel],
+    batch_size: int = Query(None, gt=0),
+    token: None=Depends(verify_token)
+):
     try:
-        res = await addCompanyInsights(data_list)
-        return res
+        res = await addCompanyInsights(data_list, batch_size)
+        return json_response(res, status_code=bulk_write_status(res))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error adding all data: {str(e)}")
 
@@ -64,4 +95,17 @@ async def delete_all_company_insights_data(token: None=Depends(verify_token)):
             raise HTTPException(status_code=404, detail=res["error"])
         return res
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error deleting all data: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error deleting all data: {str(e)}")
+
+# Delete Company Insights/Chatbot role Records by ids and/or filter sets (company_name) at a time
+@router.post("/bulk-delete-company-insights-data")
+async def bulk_delete_company_insights_data(data: BulkDeleteModel, token: None=Depends(verify_token)):
+    if not data.ids and not data.filters:
+        raise HTTPException(status_code=400, detail="At least one id or filter must be provided.")
+    try:
+        res = await bulkDeleteCompanyInsightsData(data.ids, data.filters)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting data: {str(e)}")
+    if "error" in res:
+        raise HTTPException(status_code=400, detail=res["error"])
+    return res
\ No newline at end of file
@@ -1,12 +1,22 @@
-from fastapi import APIRouter, HTTPException, Query, Depends, Request
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, UploadFile, File
+from typing import List, Literal
 from models.dashboard_model import PlacementStatsModel, CompanyStatsModel
+from models.bulk_delete_model import BulkDeleteModel
 from services.dashboard_service import (
     getPlacementStatsData, addPlacementStatsData, deletePlacementStatsData, 
     deleteAllPlacementStatsData, getCompanyStatsData, addCompanyStatsData, 
-    deleteCompanyStatsData, deleteAllCompanyStatsData,enterPlacementStatsData,enterCompanyStatsData
+    deleteCompanyStatsData, deleteAllCompanyStatsData,enterPlacementStatsData,enterCompanyStatsData,
+    getPlacementAnalytics, getTopCompanies, getBranchOfferTotals, getSalaryPercentiles,
+    importPlacementStatsData, importCompanyStatsData, exportPlacementStatsData, exportCompanyStatsData,
+    bulkDeletePlacementStatsData, bulkDeleteCompanyStatsData
 )
 from utils.auth_utils import verify_token
+from utils.listing import page_params
+from utils.versioning import versioned_get
+from utils.tabular_import import detect_format
+from utils.tabular_export import export_response
+from utils.responses import json_response, bulk_write_status
+from database import placement_stats_collection, company_stats_collection
 
 
 router = APIRouter()
@@ -15,23 +25,56 @@ router = APIRouter()
 
 # Get Placement Stats Data (including any filters)
 @router.get("/get-data")
-async def get_dashboard_data(branch: str = Query(None), year: int = Query(None)):
+async def get_dashboard_data(
+    request: Request,
+    branch: str = Query(None),
+    year: int = Query(None),
+    page: dict = Depends(page_params)
+):
     filters = {key: value for key, value in {"branch": branch, "year": year}.items() if value is not None}
     try:
-        data = await getPlacementStatsData(filters)
-        return data
+        return await versioned_get(
+            request, placement_stats_collection.name, [filters, page],
+            lambda: getPlacementStatsData(filters, page)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching data: {str(e)}")
 
+# Export all Placement Stats Data (including any filters) as NDJSON or CSV, streamed page by page
+@router.get("/export-data")
+async def export_data(
+    branch: str = Query(None),
+    year: int = Query(None),
+    format: Literal["ndjson", "csv"] = Query("ndjson")
+):
+    filters = {key: value for key, value in {"branch": branch, "year": year}.items() if value is not None}
+    try:
+        pages, columns = exportPlacementStatsData(filters)
+        return export_response(pages, format, columns, "placement_stats")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exporting data: {str(e)}")
+
 # Enter bulk Placement Stats Data at a time
 @router.post("/add-all-data")
 async def add_all_data(data_list: List[PlacementStatsModel],token: None=Depends(verify_token)):
     try:
         res = await enterPlacementStatsData(data_list)
-        return res
+        return json_response(res, status_code=bulk_write_status(res))
     except Exception as e:
         raise HTTPException(status_code=500,detail=f"Error adding all data : {str(e)}")
 
+# Import Placement Stats Data from a CSV or XLSX file (one row per record, model fields as headers)
+@router.post("/import-data")
+async def import_data(file: UploadFile = File(...), token: None=Depends(verify_token)):
+    file_format = detect_format(file.filename, file.content_type)
+    if not file_format:
+        raise HTTPException(status_code=400, detail="Only .csv and .xlsx files are supported.")
+    try:
+        res = await importPlacementStatsData(file.file, file_format)
+        return json_response(res, status_code=bulk_write_status(res))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importing data: {str(e)}")
+
 # Enter single Placement Stats Data
 @router.post("/add-data")
 async def add_dashboard_data(data: PlacementStatsModel,token: None=Depends(verify_token)):
@@ -70,28 +113,85 @@ async def delete_all_records(token: None=Depends(verify_token)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting all data: {str(e)}")
 
+# Delete Placement Stats Records by ids and/or filter sets (branch, year) at a time
+@router.post("/bulk-delete-records")
+async def bulk_delete_records(data: BulkDeleteModel, token: None=Depends(verify_token)):
+    if not data.ids and not data.filters:
+        raise HTTPException(status_code=400, detail="At least one id or filter must be provided.")
+    try:
+        res = await bulkDeletePlacementStatsData(data.ids, data.filters)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting data: {str(e)}")
+    if "error" in res:
+        raise HTTPException(status_code=400, detail=res["error"])
+    return res
+
+# Get Placement Analytics Summary (including any filters)
+@router.get("/get-analytics")
+async def get_analytics(year: int = Query(None), branch: str = Query(None)):
+    filters = {key: value for key, value in {"year": year, "branch": branch}.items() if value is not None}
+    try:
+        data = await getPlacementAnalytics(filters)
+        return data
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching analytics: {str(e)}")
+
 
 # Company Stats Controllers
 
 # Get Company Stats Data (including any filters)
 @router.get("/get-company-data")
-async def get_company_data(company_name: str = Query(None), year: int = Query(None), branch: str = Query(None)):
+async def get_company_data(
+    request: Request,
+    company_name: str = Query(None),
+    year: int = Query(None),
+    branch: str = Query(None),
+    page: dict = Depends(page_params)
+):
     filters = {key: value for key, value in {"company_name": company_name, "branch": branch, "year": year}.items() if value is not None}
     try:
-        data = await getCompanyStatsData(filters)
-        return data
+        return await versioned_get(
+            request, company_stats_collection.name, [filters, page],
+            lambda: getCompanyStatsData(dict(filters), page)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching data: {str(e)}")
 
+# Export all Company Stats Data (including any filters) as NDJSON or CSV, streamed page by page
+@router.get("/export-company-data")
+async def export_company_data(
+    company_name: str = Query(None),
+    year: int = Query(None),
+    format: Literal["ndjson", "csv"] = Query("ndjson")
+):
+    filters = {key: value for key, value in {"company_name": company_name, "year": year}.items() if value is not None}
+    try:
+        pages, columns = exportCompanyStatsData(filters)
+        return export_response(pages, format, columns, "company_stats")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error exporting data: {str(e)}")
+
 # Enter bulk Company Stats Data at a time
 @router.post("/add-all-company-data")
 async def add_all_data(data_list: List[CompanyStatsModel],token: None=Depends(verify_token)):
     try:
         res = await enterCompanyStatsData(data_list)
-        return res
+        return json_response(res, status_code=bulk_write_status(res))
     except Exception as e:
         raise HTTPException(status_code=500,detail=f"Error adding all data : {str(e)}")
 
+# Import Company Stats Data from a CSV or XLSX file (one row per record, model fields as headers)
+@router.post("/import-company-data")
+async def import_company_data(file: UploadFile = File(...), token: None=Depends(verify_token)):
+    file_format = detect_format(file.filename, file.content_type)
+    if not file_format:
+        raise HTTPException(status_code=400, detail="Only .csv and .xlsx files are supported.")
+    try:
+        res = await importCompanyStatsData(file.file, file_format)
+        return json_response(res, status_code=bulk_write_status(res))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importing company data: {str(e)}")
+
 # Enter single Company Stats Data
 @router.post("/add-company-data")
 async def add_company_data(data: CompanyStatsModel,token: None=Depends(verify_token)):
@@ -129,4 +229,53 @@ async def delete_all_company_records(token: None=Depends(verify_token)):
             raise HTTPException(status_code=404, detail=res["error"])
         return res
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error deleting all data: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error deleting all data: {str(e)}")
+
+# Delete Company Stats Records by ids and/or filter sets (company_name, year) at a time
+@router.post("/bulk-delete-company-data")
+async def bulk_delete_company_records(data: BulkDeleteModel, token: None=Depends(verify_token)):
+    if not data.ids and not data.filters:
+        raise HTTPException(status_code=400, detail="At least one id or filter must be provided.")
+    try:
+        res = await bulkDeleteCompanyStatsData(data.ids, data.filters)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting data: {str(e)}")
+    if "error" in res:
+        raise HTTPException(status_code=400, detail=res["error"])
+    return res
+
+# Company Stats Aggregate Controllers
+
+# Get Top-N Companies by salary, total offers or internship PPOs
+@router.get("/top-companies")
+async def get_top_companies(
+    n: int = Query(10, gt=0, le=1000),
+    by: Literal["salary", "total_offers", "internship_ppo"] = Query("salary"),
+    year: int = Query(None)
+):
+    try:
+        return await getTopCompanies(n, by, year)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching top companies: {str(e)}")
+
+# Get Branch-wise Offer Totals across years
+@router.get("/branch-offers")
+async def get_branch_offers(from_year: int = Query(None), to_year: int = Query(None)):
+    try:
+        return await getBranchOfferTotals(from_year, to_year)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching branch offers: {str(e)}")
+
+# Get Salary Percentiles (comma separated, e.g. 25,50,75,90)
+@router.get("/salary-percentiles")
+async def get_salary_percentiles(percentiles: str = Query("25,50,75,90"), year: int = Query(None)):
+    try:
+        values = [float(value) for value in percentiles.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Percentiles must be comma separated numbers.")
+    if not values or any(value < 0 or value > 100 for value in values):
+        raise HTTPException(status_code=400, detail="Percentiles must be between 0 and 100.")
+    try:
+        return await getSalaryPercentiles(values, year)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching salary percentiles: {str(e)}")
@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from utils.warmup import readiness
+
+router = APIRouter()
+
+# Health Controllers
+
+# Liveness: the process is up and serving requests
+@router.get("/live")
+async def live():
+    return {"status": "ok"}
+
+# Readiness: models, stores and caches have been preloaded and warmed up
+@router.get("/ready")
+async def ready():
+    if not readiness["ready"]:
+        return JSONResponse(status_code=503, content={"status": "warming-up", **readiness})
+    return {"status": "ready", **readiness}
@@ -7,6 +7,9 @@ os.makedirs(DB_PATH, exist_ok=True)  # ✅ Automatically creates db folder
 
 chroma_client = chromadb.PersistentClient(DB_PATH)
 
+# Largest number of records the backend accepts in a single add/upsert call
+MAX_BATCH_SIZE = chroma_client.get_max_batch_size()
+
 placement_stats_collection = chroma_client.get_or_create_collection(name="PlacementStatsData")
 company_stats_collection = chroma_client.get_or_create_collection(name="CompanyStatsData")
-company_insights_collection = chroma_client.get_or_create_collection(name="CompanyInsightsData")
\ No newline at end of file
+company_insights_collection = chroma_client.get_or_create_collection(name="CompanyInsightsData")
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+from typing import List, Dict, Union
+
+# Bulk delete request: records to delete by id and/or by equality filters,
+# e.g. {"ids": ["uuid"], "filters": [{"year": 2021}, {"branch": "ECE", "year": 2022}]}
+class BulkDeleteModel(BaseModel):
+    ids: List[str] = []
+    filters: List[Dict[str, Union[int, str]]] = []
@@ -0,0 +1,5 @@
+from fastapi import APIRouter
+from controllers.health_controller import router as health_controller
+
+router = APIRouter()
+router.include_router(health_controller, prefix="/health", tags=["Health"])
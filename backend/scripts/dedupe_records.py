@@ -0,0 +1,73 @@
+# Collapses duplicate records left by the uuid4-keyed add routes: records sharing a natural key
+# (branch+year, company+year, company+role) are reduced to one stored under the deterministic id,
+# so later upserts replace it. The record kept is the one already under that id, else the newest.
+# Run from the backend folder (with the server stopped): python scripts/dedupe_records.py [--dry-run]
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import placement_stats_collection, company_stats_collection, company_insights_collection, MAX_BATCH_SIZE
+from utils.bm25_index import insights_index
+from utils.record_keys import placement_stats_key, company_stats_key, company_insights_key
+
+COLLECTIONS = [
+    (placement_stats_collection, placement_stats_key),
+    (company_stats_collection, company_stats_key),
+    (company_insights_collection, company_insights_key),
+]
+
+# Natural-key id -> stored ids with that key, in Chroma's offset order (oldest first)
+def _group_ids(collection, key_of, page_size: int) -> tuple[dict, int]:
+    groups, offset = {}, 0
+    while True:
+        page = collection.get(limit=page_size, offset=offset, include=["metadatas"])
+        if not page["ids"]:
+            return groups, offset
+        for entry_id, metadata in zip(page["ids"], page["metadatas"]):
+            groups.setdefault(key_of(metadata or {}), []).append(entry_id)
+        offset += len(page["ids"])
+
+def dedupe(collection, key_of, dry_run: bool = False, page_size: int = MAX_BATCH_SIZE) -> dict:
+    groups, scanned = _group_ids(collection, key_of, page_size)
+    rekey, remove = {}, []
+    for key, ids in groups.items():
+        if ids == [key]:
+            continue
+        keeper = key if key in ids else ids[-1]
+        if keeper != key:
+            rekey[keeper] = key
+        remove.extend(entry_id for entry_id in ids if entry_id != key)
+    report = {
+        "scanned": scanned,
+        "removed": len(remove) - len(rekey),
+        "rekeyed": len(rekey),
+    }
+    if dry_run:
+        return report
+    keepers = list(rekey)
+    for start in range(0, len(keepers), page_size):
+        stored = collection.get(ids=keepers[start:start + page_size], include=["documents", "metadatas", "embeddings"])
+        collection.upsert(
+            ids=[rekey[entry_id] for entry_id in stored["ids"]],
+            documents=stored["documents"],
+            metadatas=stored["metadatas"],
+            embeddings=stored["embeddings"],
+        )
+    for start in range(0, len(remove), page_size):
+        collection.delete(ids=remove[start:start + page_size])
+    return report
+
+if __name__ == "__main__":
+    dry_run = "--dry-run" in sys.argv[1:]
+    for collection, key_of in COLLECTIONS:
+        report = dedupe(collection, key_of, dry_run)
+        print(
+            f"{collection.name}: {report['scanned']} record(s), {report['removed']} duplicate(s) removed, "
+            f"{report['rekeyed']} re-keyed" + (" (dry run)" if dry_run else "")
+        )
+        # The persisted BM25 index is only trusted while its document count matches the collection,
+        # which re-keying alone does not change
+        if collection is company_insights_collection and not dry_run and (report["removed"] or report["rekeyed"]):
+            if os.path.exists(insights_index.path):
+                os.remove(insights_index.path)
@@ -0,0 +1,59 @@
+# Local stand-in for the Ollama /api/generate endpoint that streams canned tokens.
+# Useful for testing the streaming chatbot endpoint without a model:
+#   python scripts/fake_ollama.py --port 11435 --delay 0.05
+#   python scripts/fake_ollama.py --fail-after 3    (drops the connection after 3 tokens)
+#   CHATBOT_ENDPOINT=http://127.0.0.1:11435/api/generate python server.py
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_TOKENS = [
+    "As per my knowledge, ", "the ", "hiring ", "process ", "has ", "three ", "rounds:\n",
+    "- Aptitude test\n", "- Technical interview\n", "- HR interview",
+]
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    # HTTP/1.0 lets the body run until the connection closes, so no chunked encoding is needed
+    protocol_version = "HTTP/1.0"
+    delay = 0.05
+    # Tokens streamed before the connection is dropped mid-response (None streams them all)
+    fail_after = None
+
+    def do_POST(self):
+        if self.path != "/api/generate":
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        model = body.get("model", "fake")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        if self.fail_after is not None:
+            # Promises more body than is sent, so the client sees a truncated response, not a normal end
+            self.send_header("Content-Length", str(1 << 20))
+        self.end_headers()
+        if not body.get("stream", True):
+            self.wfile.write(json.dumps({"model": model, "response": "".join(CANNED_TOKENS), "done": True}).encode())
+            return
+        for index, token in enumerate(CANNED_TOKENS):
+            if index == self.fail_after:
+                return
+            self.wfile.write((json.dumps({"model": model, "response": token, "done": False}) + "\n").encode())
+            self.wfile.flush()
+            time.sleep(self.delay)
+        self.wfile.write((json.dumps({"model": model, "response": "", "done": True}) + "\n").encode())
+
+    def log_message(self, format, *args):
+        pass
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Ollama server streaming canned tokens")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--delay", type=float, default=0.05, help="Seconds between streamed tokens")
+    parser.add_argument("--fail-after", type=int, default=None, help="Drop the connection after this many tokens")
+    args = parser.parse_args()
+    FakeOllamaHandler.delay = args.delay
+    FakeOllamaHandler.fail_after = args.fail_after
+    print(f"Fake Ollama listening on http://{args.host}:{args.port}/api/generate")
+    ThreadingHTTPServer((args.host, args.port), FakeOllamaHandler).serve_forever()
@@ -0,0 +1,13 @@
+# One-time migration: adds company_key and rounds_json to existing company insights records
+# so company filters can be pushed down into Chroma and rounds no longer need reparsing.
+# The server also runs it during warm-up; this script is for migrating without starting it.
+# Run from the backend folder: python scripts/migrate_company_insights.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.company_insights_service import migrateLegacyCompanyInsights
+
+if __name__ == "__main__":
+    print(f"Migrated {len(migrateLegacyCompanyInsights())} company insights record(s).")
@@ -0,0 +1,37 @@
+# Re-encodes every company insights document with the configured EMBEDDING_BACKEND and records
+# that backend on the collection. Needed after switching to a backend with a different vector space.
+# The records are copied into a new collection that replaces the old one only once it is complete
+# (Chroma fixes a collection's vector dimension, so vectors cannot be swapped in place).
+# Run from the backend folder (with the server stopped): python scripts/reembed_company_insights.py
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import chroma_client, company_insights_collection, MAX_BATCH_SIZE
+from utils.embedding_model import get_embedding_model, stamp_collection_backend, EMBEDDING_BACKEND
+
+def reembed(page_size: int = MAX_BATCH_SIZE, batch_size: int = 64) -> int:
+    model = get_embedding_model()
+    name = company_insights_collection.name
+    staging_name = f"{name}_reembed"
+    try:
+        chroma_client.delete_collection(staging_name)
+    except Exception:
+        pass
+    staging = chroma_client.create_collection(staging_name, metadata=company_insights_collection.metadata)
+    copied = 0
+    while True:
+        page = company_insights_collection.get(limit=page_size, offset=copied, include=["documents", "metadatas"])
+        if not page["ids"]:
+            break
+        embeddings = model.encode(page["documents"], batch_size=batch_size).tolist()
+        staging.add(ids=page["ids"], documents=page["documents"], metadatas=page["metadatas"], embeddings=embeddings)
+        copied += len(page["ids"])
+    chroma_client.delete_collection(name)
+    staging.modify(name=name)
+    stamp_collection_backend(staging)
+    return copied
+
+if __name__ == "__main__":
+    print(f"Re-embedded {reembed()} company insights record(s) with the {EMBEDDING_BACKEND} backend.")
@@ -1,11 +1,26 @@
 import asyncio
+import os
+from dataclasses import dataclass
+from functools import lru_cache
 from models.chatbot_model import ChatbotModel
-from database import company_insights_collection, company_stats_collection
 
-from utils.embedding_model import get_embedding_model
-from utils.cache import get_cached_response, set_cached_response
-from utils.llm import query_ollama
+from database import company_insights_collection
+from utils.embedding_model import check_collection_backend
+from utils.embedding_executor import embedding_executor
+from utils.cache import get_cached_response, set_cached_response, cache_stats, normalize_key
+from utils.semantic_cache import semantic_cache
+from utils.singleflight import SingleFlight, TokenFanout
+from utils.llm import query_ollama, stream_ollama, llm_stats
 from utils.nlp import extract_entities
+from utils.intent import IntentClassifier
+from utils.query_analysis import QueryAnalysis, normalize_whitespace, company_and_year
+from utils.company_stats_snapshot import company_stats_snapshot
+from utils.hybrid_retrieval import hybrid_search
+from utils.bm25_index import insights_index
+from utils.company_resolver import company_resolver
+from utils.context_assembler import (
+    CONTEXT_INSIGHTS_CANDIDATES, score_insights, score_stats, assemble_context, context_stats
+)
 
 # Greeting response map
 GREETING_RESPONSES = {
@@ -45,104 +60,107 @@ IRRELEVANT_RESPONSE = (
     "Feel free to ask me about companies, roles, offers, internships, or hiring stats!"
 )
 
+# Compiled once at import; classifies a query in a single pass over its text
+intent_classifier = IntentClassifier(list(GREETING_RESPONSES), PLACEMENT_KEYWORDS)
+company_resolver.set_keywords(PLACEMENT_KEYWORDS)
+
+# In-flight chatbot answers keyed on the normalized query
+chatbot_flights = SingleFlight()
+# Token streams of the in-flight streaming answers, keyed like chatbot_flights
+_answer_streams: dict[str, TokenFanout] = {}
+
+# Number of recent query analyses kept in memory
+QUERY_ANALYSIS_CACHE_SIZE = int(os.getenv("QUERY_ANALYSIS_CACHE_SIZE", 1024))
+
+# Runs intent classification and entity resolution once per distinct query (and resolver
+# version, so new company names are picked up). Known company names and years come from the
+# resolver index; spaCy NER runs when the resolver finds no company, so a company missing from the
+# index is still recognized (and a year found by the resolver is kept). Greetings skip both.
+@lru_cache(maxsize=QUERY_ANALYSIS_CACHE_SIZE)
+def _analyze(query: str, resolver_version: int) -> QueryAnalysis:
+    intent = intent_classifier.classify(query)
+    if intent.intent == "greeting":
+        return QueryAnalysis(query, intent)
+    company, year = company_resolver.resolve(query)
+    if company:
+        entities = tuple((text, label) for text, label in ((company, "ORG"), (year, "DATE")) if text)
+        return QueryAnalysis(query, intent, entities, company, year)
+    entities = tuple(extract_entities(query))
+    company, ner_year = company_and_year(entities)
+    return QueryAnalysis(query, intent, entities, company, year or ner_year)
+
+def analyze_query(query: str) -> QueryAnalysis:
+    return _analyze(normalize_whitespace(query), company_resolver.refresh())
+
 # Detect if it's a greeting
-def get_greeting_response(query: str) -> str | None:
-    lower_query = query.strip().lower()
-    for greet, response in GREETING_RESPONSES.items():
-        if greet in lower_query:
-            return response
+def get_greeting_response(analysis: QueryAnalysis) -> str | None:
+    if analysis.intent.intent == "greeting":
+        return GREETING_RESPONSES[analysis.intent.greeting]
     return None
 
 # Detect if the query is irrelevant to placements
-def is_irrelevant_query(query: str) -> bool:
-    lower_query = query.lower()
-    if any(keyword in lower_query for keyword in PLACEMENT_KEYWORDS):
+def is_irrelevant_query(analysis: QueryAnalysis) -> bool:
+    if analysis.intent.keywords:
         return False
-    entities = extract_entities(query)
-    for text, label in entities:
-        if label == "ORG" or (label == "DATE" and text.isdigit()):
-            return False
-    return True
+    return analysis.company is None and analysis.year is None
+
+# State carried from the retrieval steps to the LLM and caching steps
+@dataclass(slots=True)
+class PendingAnswer:
+    prompt: str
+    analysis: QueryAnalysis
+    query_embedding: list[float]
+    context: dict
+
+# Runs steps 1-7 of the pipeline. Returns (response, None) when the answer is available
+# without the LLM (rule-based or cached), otherwise (None, PendingAnswer) for the LLM step.
+async def _prepare_chatbot_answer(query: str):
+    await company_resolver.ensure_loaded()
+    analysis = analyze_query(query)
 
-# Main function
-async def get_chatbot_answer(query: str):
     # 1. Handle Greetings
-    greeting_response = get_greeting_response(query)
+    greeting_response = get_greeting_response(analysis)
     if greeting_response:
-        return {"answer": greeting_response, "source": "rule-based"}
+        return {"answer": greeting_response, "source": "rule-based"}, None
 
     # 2. Handle Irrelevant Queries
-    if is_irrelevant_query(query):
-        return {"answer": IRRELEVANT_RESPONSE, "source": "rule-based"}
+    if is_irrelevant_query(analysis):
+        return {"answer": IRRELEVANT_RESPONSE, "source": "rule-based"}, None
 
     # 3. Check Cache
-    cached_response = get_cached_response(query)
+    cached_response = await get_cached_response(query)
     if cached_response:
-        return {"answer": cached_response["answer"], "source": "cache"}
-
-    # 4. Extract Entities
-    entities = extract_entities(query)
-    company = None
-    year = None
+        return {"answer": cached_response["answer"], "source": "cache"}, None
 
-    for text, label in entities:
-        if label == "ORG":
-            company = text
-        elif label == "DATE" and text.isdigit():
-            year = text
+    # 4. Entities (extracted once during analysis)
+    company = analysis.company
+    year = analysis.year
 
     # 5. Query ChromaDB
-    model = get_embedding_model()
-    query_embedding = model.encode(query).tolist()
-
-    results = await asyncio.to_thread(
-        company_insights_collection.query,
-        query_embeddings=[query_embedding],
-        n_results=5,
-    )
-    chroma_context = "\n\n".join(results["documents"][0])
-
-    # 6. Additional Stats Context
-    stats_context = ""
+    # Encoded on the embedding workers, batched with concurrent queries
+    query_embedding = (await embedding_executor.encode([query]))[0].tolist()
+
+    # 5a. Semantic Cache (same company/year, near-identical question)
+    semantic_response = semantic_cache.lookup(query_embedding, company, year)
+    if semantic_response:
+        return {"answer": semantic_response["answer"], "source": "semantic-cache"}, None
+
+    # Dense and BM25 results fused, so exact company and role names are not outranked
+    # (BM25 only while the stored vectors come from a different embedding backend)
+    mismatch = await asyncio.to_thread(check_collection_backend, company_insights_collection)
+    hits = await hybrid_search(query, query_embedding, CONTEXT_INSIGHTS_CANDIDATES, use_vectors=not mismatch)
+    insights_chunks = score_insights(hits, company)
+
+    # 6. Additional Stats Context (ranked rows from the in-memory company stats snapshot)
+    stats_chunks = []
     try:
-        filters = {}
-        if company:
-            filters["company_name"] = company.upper()
-        if year:
-            filters["year"] = int(year)
-
-        if filters:
-            if len(filters) == 1:
-                key, value = next(iter(filters.items()))
-                conditions = {key: {"$eq": value}}
-            else:
-                conditions = {"$and": [{key: {"$eq": value}} for key, value in filters.items()]}
-        else:
-            conditions = {}
-
-        stats_data = await asyncio.to_thread(
-            lambda: company_stats_collection.get(where=conditions) if filters else company_stats_collection.get()
-        )
-        metadatas = stats_data.get("metadatas", [])
-
-        if metadatas:
-            stats_context = "\n\n".join([
-                (
-                    f"Company: {meta.get('company_name')}, Year: {meta.get('year')}\n"
-                    f"Salary: {meta.get('salary', 'N/A')} LPA, Internship PPOs: {meta.get('internship_ppo', 'N/A')}\n"
-                    f"Total Offers: {meta.get('total_offers', 0)}\n"
-                    f"Branch-wise Offers: CSE: {meta.get('CSE', 0)}, CSBS: {meta.get('CSBS', 0)}, "
-                    f"CYS: {meta.get('CYS', 0)}, AIML: {meta.get('AIML', 0)}, DS: {meta.get('DS', 0)}, "
-                    f"IOT: {meta.get('IOT', 0)}, IT: {meta.get('IT', 0)}, ECE: {meta.get('ECE', 0)}, "
-                    f"EEE: {meta.get('EEE', 0)}, EIE: {meta.get('EIE', 0)}, MECH: {meta.get('MECH', 0)}, "
-                    f"CIVIL: {meta.get('CIVIL', 0)}, AUTO: {meta.get('AUTO', 0)}"
-                )
-                for meta in metadatas
-            ])
+        await company_stats_snapshot.ensure_loaded()
+        stats_chunks = score_stats(company_stats_snapshot, query, company, int(year) if year else None)
     except Exception as e:
         print(f"[WARN] Failed to fetch stats context: {e}")
 
-    # 7. Final Prompt
+    # 7. Final Prompt (best chunks of both sources within the token budget)
+    chroma_context, stats_context, context_report = assemble_context(insights_chunks, stats_chunks)
     combined_context = "\n\n".join(filter(None, [chroma_context, stats_context]))
 
     prompt = f"""
@@ -187,12 +205,82 @@ async def get_chatbot_answer(query: str):
 
     Answer:"""
 
+    return None, PendingAnswer(prompt, analysis, query_embedding, context_report)
+
+# Caches a finished LLM answer unless it is a fallback/error message
+async def _cache_llm_answer(query: str, response: dict, pending: PendingAnswer):
+    answer = response["answer"]
+    if answer and response["source"] == "llm" and "Sorry" not in answer:
+        await set_cached_response(query, response)
+        semantic_cache.store(pending.query_embedding, response, pending.analysis.company, pending.analysis.year)
+
+# Main function
+# Identical concurrent queries (same cache key) are coalesced: the first caller runs the
+# embedding, Chroma and LLM work and the duplicates await its result.
+async def get_chatbot_answer(query: str):
+    return await chatbot_flights.do(normalize_key(query), lambda: _get_chatbot_answer(query))
+
+async def _get_chatbot_answer(query: str):
+    response, pending = await _prepare_chatbot_answer(query)
+    if response:
+        return response
+
     # 8. LLM Response
-    answer = await asyncio.to_thread(query_ollama, prompt)
-    response = {"answer": answer, "source": "llm"}
+    answer = await query_ollama(pending.prompt)
+    response = {"answer": answer, "source": "llm", "context": pending.context}
 
     # 9. Cache
-    if answer and response["source"] == "llm" and "Sorry" not in answer:
-        set_cached_response(query, response)
+    await _cache_llm_answer(query, response, pending)
 
     return response
+
+# Streaming variant of get_chatbot_answer. Yields (event, data) pairs:
+# "token" events while the LLM generates, then one "done" event with the full response.
+# Rule-based and cached answers are sent straight away as a single "done" event.
+# The generation runs as the in-flight call of the query: identical streams arriving meanwhile
+# receive all of its tokens and identical get_chatbot_answer calls its result.
+# An identical get_chatbot_answer call already in flight is joined for its result only.
+async def stream_chatbot_answer(query: str):
+    key = normalize_key(query)
+    task = chatbot_flights.get(key)
+    if task is None:
+        fanout = _answer_streams[key] = TokenFanout()
+        task = chatbot_flights.start(key, lambda: _stream_chatbot_answer(query, fanout))
+        task.add_done_callback(lambda _: _answer_streams.pop(key, None))
+        leader = True
+    else:
+        fanout = _answer_streams.get(key)
+        leader = False
+
+    if fanout is not None:
+        async for token in fanout.subscribe():
+            yield "token", {"token": token}
+    yield "done", await (asyncio.shield(task) if leader else chatbot_flights.wait(task))
+
+async def _stream_chatbot_answer(query: str, fanout: TokenFanout):
+    try:
+        response, pending = await _prepare_chatbot_answer(query)
+        if response:
+            return response
+
+        async for token in stream_ollama(pending.prompt):
+            fanout.publish(token)
+
+        response = {"answer": "".join(fanout.tokens), "source": "llm", "context": pending.context}
+        await _cache_llm_answer(query, response, pending)
+        return response
+    finally:
+        fanout.close()
+
+# Runtime statistics of the chatbot pipeline
+def get_chatbot_stats():
+    return {
+        "llm": llm_stats(),
+        "cache": cache_stats(),
+        "semantic_cache": semantic_cache.get_stats(),
+        "coalescing": chatbot_flights.get_stats(),
+        "context": context_stats(),
+        "bm25": insights_index.get_stats(),
+        "company_resolver": company_resolver.get_stats(),
+        "embedding": embedding_executor.get_stats(),
+    }
@@ -1,120 +1,296 @@
-import asyncio,uuid
+import asyncio,os,time,json
 from collections import defaultdict
-from database import company_insights_collection
-from models.chatbot_model import ChatbotModel
+from dotenv import load_dotenv
+from database import company_insights_collection, MAX_BATCH_SIZE
+from models.chatbot_model import ChatbotModel, Role
 
-from utils.embedding_model import get_embedding_model
+from utils.bulk_writer import bulk_upsert, last_occurrences, bulk_delete, delete_all, write_message, collection_lock
+from utils.cache import TTLCache
+from utils.listing import project, sort_records, parse_filters
+from utils.tabular_export import iter_record_pages
+from utils.record_keys import normalize_key, company_insights_id
+from utils.versioning import bump_version
+from utils.bm25_index import insights_index
+from utils.company_resolver import company_resolver
+from utils.embedding_model import check_collection_backend
+from utils.embedding_executor import embedding_executor
+
+load_dotenv()
+
+# Number of role documents encoded per SentenceTransformer batch
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+
+# Assembled company responses keyed on company_key ("*" holds the full list); cleared on writes
+_assembledCache = TTLCache(maxsize=int(os.getenv("INSIGHTS_CACHE_SIZE", 512)))
+ALL_COMPANIES = "*"
+# Bumped on every write so a read that raced with a write does not cache stale data
+_insightsWrites = 0
 
 # Company Insights Services
 
+# Columns of the CSV export: the stored role metadata, then the embedded document
+EXPORT_COLUMNS = [
+    "id", "company_name", "company_desc", "roles", "job_desc", "package", "rounds",
+    "company_key", "rounds_json", "document"
+]
+
+# Normalized company key stored with every role so company filters can use an exact where clause
+def companyKey(company_name: str) -> str:
+    return normalize_key(company_name)
+
+# Parses the legacy "Round 1: Aptitude, Round 2: HR" encoding
+def _parseRounds(rounds_str: str) -> dict:
+    rounds_dict = {}
+    for round_str in (rounds_str or "").split(", "):
+        if round_str.startswith("Round"):
+            parts = round_str.split(": ", 1)
+            if len(parts) == 2:
+                round_number = parts[0].split(" ")[1]
+                rounds_dict[round_number] = parts[1]
+    return rounds_dict
+
+# Write hook: bumps the collection version and drops the assembled responses
+# of the changed companies (or all of them)
+def _onInsightsChanged(company_keys: list[str] | None = None):
+    global _insightsWrites
+    _insightsWrites += 1
+    bump_version(company_insights_collection.name)
+    if company_keys is None:
+        _assembledCache.clear()
+        return
+    _assembledCache.delete(ALL_COMPANIES)
+    for key in company_keys:
+        _assembledCache.delete(key)
+
+# Write hooks of the add/delete paths: also keep the BM25 index and the company-name resolver in
+# sync. They run under the collection lock (see utils/bulk_writer.py); the index is saved later.
+def _onInsightsAdded(ids: list, documents: list[str], metadatas: list[dict]):
+    _onInsightsChanged(list({metadata.get("company_key") for metadata in metadatas}))
+    insights_index.add(ids, documents)
+    company_resolver.add("insights", metadatas)
+    insights_index.schedule_save()
+
+def _onInsightsRemoved(ids: list, metadatas: list[dict]):
+    _onInsightsChanged(list({metadata.get("company_key") for metadata in metadatas}))
+    insights_index.remove(ids)
+    company_resolver.remove("insights", metadatas)
+    insights_index.schedule_save()
+
+def _onInsightsCleared():
+    _onInsightsChanged()
+    insights_index.clear()
+    company_resolver.clear("insights")
+    insights_index.schedule_save()
+
+# Collection metadata flag set once every record carries company_key and rounds_json
+LEGACY_MIGRATED_KEY = "company_key_migrated"
+
+# Adds company_key and rounds_json to records stored before these fields existed, so company
+# filters (which match on company_key) find them. After the first complete pass the collection is
+# flagged and later calls return at once. Returns the ids of the updated records; the caller runs
+# the write hook.
+def migrateLegacyCompanyInsights(page_size: int = MAX_BATCH_SIZE) -> list[str]:
+    if (company_insights_collection.metadata or {}).get(LEGACY_MIGRATED_KEY):
+        return []
+    updated, offset = [], 0
+    while True:
+        page = company_insights_collection.get(limit=page_size, offset=offset, include=["metadatas"])
+        if not page["ids"]:
+            break
+        ids, metadatas = [], []
+        for entry_id, metadata in zip(page["ids"], page["metadatas"]):
+            if "company_key" in metadata and "rounds_json" in metadata:
+                continue
+            ids.append(entry_id)
+            metadatas.append({
+                **metadata,
+                "company_key": companyKey(metadata.get("company_name")),
+                "rounds_json": json.dumps(_parseRounds(metadata.get("rounds", "")))
+            })
+        if ids:
+            company_insights_collection.update(ids=ids, metadatas=metadatas)
+            updated.extend(ids)
+        offset += len(page["ids"])
+    company_insights_collection.modify(metadata={**(company_insights_collection.metadata or {}), LEGACY_MIGRATED_KEY: True})
+    return updated
+
+# Warm-up step: the migration runs in a worker thread under the collection lock and the write hook
+# (version bump, cache eviction) back on the event loop. Returns the number of records updated.
+async def migrateLegacyCompanyInsightsOnStartup() -> int:
+    async with collection_lock(company_insights_collection):
+        updated = await asyncio.to_thread(migrateLegacyCompanyInsights)
+        if updated:
+            _onInsightsChanged()
+    return len(updated)
+
+# Builds the document and metadata stored for a single role of a company
+def _buildRoleRecord(company: ChatbotModel, role: Role):
+    roleData=(
+        f"{company.description}\n"
+        f"Company Name: {company.companyName}\n"
+        f"Company Description: {company.companyDesc}\n"
+        f"Role: {role.role}\n"
+        f"Job Description: {role.jobDesc}\n"
+        f"Package: {role.package}\n"
+        f"Hiring Process:\n"+"\n".join([f"Round {k}: {v}" for k, v in role.rounds.items()])
+    )
+    metadata={
+        "company_name": company.companyName,
+        "company_desc": company.companyDesc,
+        "roles": role.role,
+        "job_desc": role.jobDesc,
+        "package": role.package,
+        "rounds": ", ".join([f"Round {k}: {v}" for k, v in role.rounds.items()]),
+        "company_key": companyKey(company.companyName),
+        "rounds_json": json.dumps(role.rounds)
+    }
+    return roleData, metadata
+
+# Ingestion engine shared by the single and bulk insert paths: every role is keyed on company and
+# role (re-posting a role replaces it), encoded in batches and written in chunked multi-record upserts.
+# Returns the written ids, failures, roles skipped in favour of a later one with the same key,
+# the number of replaced roles and the timings.
+async def _ingestCompanyInsights(data_list: list[ChatbotModel], batch_size: int | None = None):
+    batch_size = batch_size or EMBEDDING_BATCH_SIZE
+    timings = {}
+    started = time.perf_counter()
+    documents, metadatas = [], []
+    for company in data_list:
+        for role in company.roles:
+            roleData, metadata = _buildRoleRecord(company, role)
+            documents.append(roleData)
+            metadatas.append(metadata)
+    ids = [company_insights_id(metadata["company_name"], metadata["roles"]) for metadata in metadatas]
+    keep, replaced = last_occurrences(ids)
+    skipped = [
+        {"companyName": metadatas[index]["company_name"], "role": metadatas[index]["roles"],
+         "reason": "Replaced by a later role with the same company and title."}
+        for index in replaced
+    ]
+    if replaced:
+        ids, documents, metadatas = [ids[i] for i in keep], [documents[i] for i in keep], [metadatas[i] for i in keep]
+    timings["prepare_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    if not documents:
+        timings["encode_ms"] = timings["write_ms"] = 0.0
+        return ids, [], skipped, 0, timings
+
+    # Encoded on the embedding workers with the configured backend (see utils/embedding_model.py)
+    started = time.perf_counter()
+    embeddings = (await embedding_executor.encode(documents, batch_size)).tolist()
+    timings["encode_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    # Replaced records are unindexed and the written ones indexed in one step, under the lock
+    def onWritten(insertedIds: list, previous: dict):
+        inserted = set(insertedIds)
+        if previous:
+            _onInsightsRemoved(list(previous), list(previous.values()))
+        _onInsightsAdded(
+            insertedIds,
+            [document for entry_id, document in zip(ids, documents) if entry_id in inserted],
+            [metadata for entry_id, metadata in zip(ids, metadatas) if entry_id in inserted],
+        )
+
+    started = time.perf_counter()
+    insertedIds, failed, previous = await bulk_upsert(
+        company_insights_collection, ids, documents, metadatas, embeddings, on_written=onWritten
+    )
+    timings["write_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return insertedIds, failed, skipped, len(previous), timings
+
 # Add a Single Company Insights/Chatbot Record
 async def addCompanyInsightsData(data: ChatbotModel):
-    # Loading a Sentence Transformer (Light-weight model for efficiency)
-    model = get_embedding_model()
-    for role in data.roles:
-        roleData=(
-            f"{data.description}\n"
-            f"Company Name: {data.companyName}\n"
-            f"Company Description: {data.companyDesc}\n"
-            f"Role: {role.role}\n"
-            f"Job Description: {role.jobDesc}\n"
-            f"Package: {role.package}\n"
-            f"Hiring Process:\n"+"\n".join([f"Round {k}: {v}" for k, v in role.rounds.items()])
-        )
-        embeddings = model.encode(roleData).tolist()
-        metadata={
-            "company_name": data.companyName,
-            "company_desc": data.companyDesc,
-            "roles": role.role,
-            "job_desc": role.jobDesc,
-            "package": role.package,
-            "rounds": ", ".join([f"Round {k}: {v}" for k, v in role.rounds.items()])
-        }
-        await asyncio.to_thread(
-            company_insights_collection.add,
-            embeddings=[embeddings],
-            documents=[roleData],
-            metadatas=[metadata],
-            ids=[str(uuid.uuid4())]
-        )
-    return {"message": "Data added successfully!"}
+    mismatch = await asyncio.to_thread(check_collection_backend, company_insights_collection)
+    if mismatch:
+        return {"error": mismatch}
+    ids, failed, skipped, updated, timings = await _ingestCompanyInsights([data])
+    if failed:
+        return {"error": "Failed to add some roles!", "ids": ids, "updated": updated, "skipped": skipped, "failed": failed, "timings": timings}
+    return {"message": "Data added successfully!", "ids": ids, "updated": updated, "skipped": skipped, "timings": timings}
 
 # Add bulk Company Insights/Chatbot Data at a time
-async def addCompanyInsights(data_list: list[ChatbotModel]):
+async def addCompanyInsights(data_list: list[ChatbotModel], batch_size: int | None = None):
     if not data_list:
         return{"error":"No data provided!"}
-    insertedIds = []
-    model = get_embedding_model()
-    for company in data_list:
-        for role in company.roles:
-            roleData=(
-                f"{company.description}\n"
-                f"Company Name: {company.companyName}\n"
-                f"Company Description: {company.companyDesc}\n"
-                f"Role: {role.role}\n"
-                f"Job Description: {role.jobDesc}\n"
-                f"Package: {role.package}\n"
-                f"Hiring Process:\n"+"\n".join([f"Round {k}: {v}" for k, v in role.rounds.items()])
-            )
-            embeddings = model.encode(roleData).tolist()
-            metadata={
-                "company_name": company.companyName,
-                "company_desc": company.companyDesc,
-                "roles": role.role,
-                "job_desc": role.jobDesc,
-                "package": role.package,
-                "rounds": ", ".join([f"Round {k}: {v}" for k, v in role.rounds.items()])
-            }
-            await asyncio.to_thread(
-                company_insights_collection.add,
-                embeddings=[embeddings],
-                documents=[roleData],
-                metadatas=[metadata],
-                ids=[str(uuid.uuid4())]
-            )
-            insertedIds.append(str(uuid.uuid4()))
-    return {"message": "All data added successfully!", "ids": insertedIds}
-
-# Get Company Insights/Chatbot Data (including any filters)
-async def getAllCompanyInsights(filters: dict):
-    results = company_insights_collection.get(include=["metadatas"])
-    if not results or not results.get("metadatas"):
-        return {"message": "No data found."}
+    # Vectors from a different embedding backend would be meaningless next to the stored ones
+    mismatch = await asyncio.to_thread(check_collection_backend, company_insights_collection)
+    if mismatch:
+        return {"error": mismatch}
+    insertedIds, failed, skipped, updated, timings = await _ingestCompanyInsights(data_list, batch_size)
+    report = {"ids": insertedIds, "updated": updated, "skipped": skipped, "failed": failed, "timings": timings}
+    if not insertedIds:
+        return {"error": "No valid roles were inserted!", **report}
+    roles = sum(len(company.roles) for company in data_list)
+    return {"message": write_message(len(insertedIds), roles, "role"), **report}
+
+# Groups role metadatas into company objects; spellings differing only in case or spacing are merged
+def _assembleCompanies(metadatas: list[dict]) -> list[dict]:
     company_map = defaultdict(lambda: {
         "companyName": "",
         "companyDesc": "",
         "roles": []
     })
-    for metadata in results["metadatas"]:
+    for metadata in metadatas:
         curr_company = metadata.get("company_name")
-        if filters and "company_name" in filters:
-            if curr_company.lower() != filters["company_name"].lower():
-                continue
-        company_desc = metadata.get("company_desc")
-        role_name = metadata.get("roles")
-        job_desc = metadata.get("job_desc")
-        package = metadata.get("package")
-        rounds_str = metadata.get("rounds", "")
-        rounds_dict = {}
-        for round_str in rounds_str.split(", "):
-            if round_str.startswith("Round"):
-                parts = round_str.split(": ", 1)
-                if len(parts) == 2:
-                    round_number = parts[0].split(" ")[1]
-                    rounds_dict[round_number] = parts[1]
+        key = metadata.get("company_key") or companyKey(curr_company)
+        rounds_json = metadata.get("rounds_json")
         role_obj = {
-            "role": role_name,
-            "jobDesc": job_desc,
-            "package": package,
-            "rounds": rounds_dict
+            "role": metadata.get("roles"),
+            "jobDesc": metadata.get("job_desc"),
+            "package": metadata.get("package"),
+            "rounds": json.loads(rounds_json) if rounds_json else _parseRounds(metadata.get("rounds", ""))
         }
-        company_map[curr_company]["companyName"] = curr_company
-        company_map[curr_company]["companyDesc"] = company_desc
-        company_map[curr_company]["roles"].append(role_obj)
-    result = list(company_map.values())
-    if filters and "company_name" in filters:
-        return result[0] if result else {"message": "Company not found."}
-    return result
+        company = company_map[key]
+        company["companyName"] = company["companyName"] or curr_company
+        company["companyDesc"] = metadata.get("company_desc")
+        company["roles"].append(role_obj)
+    return list(company_map.values())
+
+# Returns the assembled companies for one company_key (or ALL_COMPANIES), from cache when possible
+async def _getAssembledCompanies(key: str) -> list[dict]:
+    cached = _assembledCache.get(key)
+    if cached is not None:
+        return cached
+    writes = _insightsWrites
+    if key == ALL_COMPANIES:
+        results = await asyncio.to_thread(company_insights_collection.get, include=["metadatas"])
+    else:
+        results = await asyncio.to_thread(
+            company_insights_collection.get,
+            where={"company_key": {"$eq": key}},
+            include=["metadatas"]
+        )
+    companies = _assembleCompanies(results.get("metadatas") or [])
+    if writes == _insightsWrites:
+        _assembledCache.set(key, companies)
+    return companies
+
+# Get Company Insights/Chatbot Data (including any filters), paged by company,
+# together with the total number of matching companies
+async def getAllCompanyInsights(filters: dict, page: dict | None = None):
+    page = page or {}
+    fields = page.get("fields")
+    company_name = filters.get("company_name") if filters else None
+    if company_name:
+        result = await _getAssembledCompanies(companyKey(company_name))
+        if not result:
+            return {"message": "Company not found."}, 0
+        return project(result[0], fields, keep=("companyName",)), 1
+    result = await _getAssembledCompanies(ALL_COMPANIES)
+    if not result:
+        return {"message": "No data found."}, 0
+    total = len(result)
+    result = sort_records(result, page.get("sort"))
+    offset = page.get("offset", 0)
+    limit = page.get("limit")
+    result = result[offset:offset + limit if limit is not None else None]
+    return [project(company, fields, keep=("companyName",)) for company in result], total
+
+# Streams every stored role record (optionally of one company) page by page for export, with its
+# document and optionally its embedding, together with the export columns
+def exportCompanyInsights(company_name: str | None = None, include_embeddings: bool = False):
+    where = {"company_key": {"$eq": companyKey(company_name)}} if company_name else None
+    pages = iter_record_pages(company_insights_collection, where, documents=True, embeddings=include_embeddings)
+    return pages, EXPORT_COLUMNS + (["embedding"] if include_embeddings else [])
 
 # Delete a Company Insights/Chatbot Record (including filters)
 async def deleteCompanyInsightsData(filters: dict):
@@ -122,37 +298,43 @@ async def deleteCompanyInsightsData(filters: dict):
         return {"error": "No filters provided!"}
     entry_id=filters.get("entry_id")
     if entry_id:
-        storedData = await asyncio.to_thread(
-            company_insights_collection.get,
-            ids=[entry_id]
-        )
-        if not storedData.get("ids"):
+        result = await bulk_delete(company_insights_collection, ids=[entry_id], on_deleted=_onInsightsRemoved)
+        if not result["ids"]:
             return {"error": "No data found!"}
-        await asyncio.to_thread(
-            company_insights_collection.delete,
-            ids=[entry_id]
-        )
         return {"message": "Data deleted successfully!","id":entry_id}
     company_name=filters.get("company_name")
     if company_name:
-        storedData = await asyncio.to_thread(
-            company_insights_collection.get,
-            where={"company_name": {"$eq": company_name}}
+        result = await bulk_delete(
+            company_insights_collection, filters=[{"company_key": companyKey(company_name)}], on_deleted=_onInsightsRemoved
         )
-        if not storedData.get("ids"):
+        if not result["ids"]:
             return {"error": "No data found!"}
-        await asyncio.to_thread(
-            company_insights_collection.delete,
-            where={"company_name": {"$eq": company_name}}
-        )
         return {"message": "Data deleted successfully!","company_name":company_name}
 
 # Delete all Company Insights/Chatbot Records at a time
 async def deleteAllCompanyInsightsData():
-    storedData = await asyncio.to_thread(company_insights_collection.get)
-    if not storedData.get("ids"):
+    deleted = await delete_all(company_insights_collection, on_cleared=_onInsightsCleared)
+    if not deleted:
         return {"error": "No data found!"}
-    await asyncio.to_thread(company_insights_collection.delete, where={"company_name": {"$gte": 0}})
-    return {"message": "All data deleted successfully!"}
+    return {"message": "All data deleted successfully!", "deleted": deleted}
+
+# Delete Company Insights/Chatbot role records by ids and/or company_name filters at a time,
+# reporting the deleted count overall and per filter, and the ids that did not exist
+async def bulkDeleteCompanyInsightsData(ids: list, filters: list):
+    try:
+        parsed = parse_filters(filters, {"company_name": str})
+    except ValueError as e:
+        return {"error": str(e)}
+    result = await bulk_delete(
+        company_insights_collection, ids, [{"company_key": companyKey(where["company_name"])} for where in parsed],
+        on_deleted=_onInsightsRemoved
+    )
+    return {
+        "message": f"Deleted {len(result['ids'])} record(s) successfully!",
+        "deleted": len(result["ids"]),
+        "deleted_ids": result["ids"],
+        "not_found": result["not_found"],
+        "filters": [{"filter": where, "deleted": count} for where, count in zip(parsed, result["filter_counts"])]
+    }
 
 
@@ -1,58 +1,193 @@
-import asyncio
-import uuid
 from database import placement_stats_collection, company_stats_collection
 from models.dashboard_model import PlacementStatsModel, CompanyStatsModel
+from utils.bulk_writer import bulk_upsert, last_occurrences, bulk_delete, delete_all, write_message
+from utils.tabular_import import import_sheet
+from utils.tabular_export import iter_record_pages
+from utils.listing import build_where, fetch_page, project, parse_filters
+from utils.placement_summary import placement_summary
+from utils.company_stats_snapshot import company_stats_snapshot
+from utils.versioning import bump_version
+from utils.company_resolver import company_resolver
+from utils.record_keys import placement_stats_id, company_stats_id
+
+# Write hooks: bump the collection version and keep the derived read models
+# (analytics summary, company stats snapshot, company-name resolver) in sync
+def _onPlacementStatsAdded(ids: list, metadatas: list[dict]):
+    bump_version(placement_stats_collection.name)
+    placement_summary.add_placement(metadatas)
+
+def _onPlacementStatsRemoved(ids: list, metadatas: list[dict]):
+    bump_version(placement_stats_collection.name)
+    placement_summary.remove_placement(metadatas)
+
+def _onPlacementStatsCleared():
+    bump_version(placement_stats_collection.name)
+    placement_summary.clear_placement()
+
+def _onCompanyStatsAdded(ids: list, metadatas: list[dict]):
+    bump_version(company_stats_collection.name)
+    placement_summary.add_company(metadatas)
+    company_stats_snapshot.add(ids, metadatas)
+    company_resolver.add("stats", metadatas)
+
+def _onCompanyStatsRemoved(ids: list, metadatas: list[dict]):
+    bump_version(company_stats_collection.name)
+    placement_summary.remove_company(metadatas)
+    company_stats_snapshot.remove(ids)
+    company_resolver.remove("stats", metadatas)
+
+def _onCompanyStatsCleared():
+    bump_version(company_stats_collection.name)
+    placement_summary.clear_company()
+    company_stats_snapshot.clear()
+    company_resolver.clear("stats")
+
+# Natural-key ids: one record per branch and year, and per company and year
+def _placementStatsId(entryDict: dict) -> str:
+    return placement_stats_id(entryDict["branch"], entryDict["year"])
+
+def _companyStatsId(entryDict: dict) -> str:
+    return company_stats_id(entryDict["company_name"], entryDict["year"])
+
+# Optional Company Stats fields are left out of the stored metadata when empty; they are cleared
+# explicitly on upsert so a replaced record does not keep its old values
+COMPANY_STATS_FIELDS = tuple(CompanyStatsModel.model_fields)
+
+# Upserts prepared rows through the bulk engine under their natural-key ids and reports written,
+# replaced ("updated"), skipped and failed rows. Of rows sharing a key only the last is written.
+# onRemoved receives the replaced records' previous metadatas, onInserted the stored ones; both run
+# under the collection lock, so the derived read models see the writes of an id in order.
+async def _bulkWriteStats(collection, rows: list, skipped: list, recordId, onInserted, onRemoved, clearKeys=()):
+    ids = [recordId(entryDict) for _, entryDict in rows]
+    keep, replaced = last_occurrences(ids)
+    if replaced:
+        skipped = sorted(
+            skipped + [{"index": rows[index][0], "reason": "Replaced by a later record with the same key."} for index in replaced],
+            key=lambda entry: entry["index"]
+        )
+        rows, ids = [rows[index] for index in keep], [ids[index] for index in keep]
+    documents = [str(entryDict) for _, entryDict in rows]
+    metadatas = [entryDict for _, entryDict in rows]
+    def onWritten(writtenIds: list, previous: dict):
+        if previous:
+            onRemoved(list(previous), list(previous.values()))
+        written = set(writtenIds)
+        stored = [(entry_id, metadata) for entry_id, metadata in zip(ids, metadatas) if entry_id in written]
+        onInserted([entry_id for entry_id, _ in stored], [metadata for _, metadata in stored])
+    writtenIds, failed, previous = await bulk_upsert(
+        collection, ids, documents, metadatas, clear_keys=clearKeys, on_written=onWritten
+    )
+    for failure in failed:
+        failure["index"] = rows[failure["index"]][0]
+    return {
+        "ids": writtenIds,
+        "inserted": len(writtenIds) - len(previous),
+        "updated": len(previous),
+        "skipped": skipped,
+        "failed": failed
+    }
+
+# Filter fields (and their types) accepted by the bulk delete routes
+PLACEMENT_DELETE_FIELDS = {"branch": str, "year": int}
+COMPANY_DELETE_FIELDS = {"company_name": str, "year": int}
+
+# Deletes records by ids and/or equality filters (all filters in a single where clause), reporting
+# the deleted count overall and per filter, and the ids that did not exist
+async def _bulkDeleteStats(collection, ids: list, filters: list, fields: dict, onRemoved):
+    try:
+        parsed = parse_filters(filters, fields)
+    except ValueError as e:
+        return {"error": str(e)}
+    result = await bulk_delete(collection, ids, parsed, on_deleted=onRemoved)
+    return {
+        "message": f"Deleted {len(result['ids'])} record(s) successfully!",
+        "deleted": len(result["ids"]),
+        "deleted_ids": result["ids"],
+        "not_found": result["not_found"],
+        "filters": [{"filter": where, "deleted": count} for where, count in zip(parsed, result["filter_counts"])]
+    }
+
+# Streams an uploaded CSV/XLSX sheet into a stats collection: each validated batch goes through
+# prepare (the same checks as the JSON bulk routes) and the bulk writer; indexes in the batch
+# reports are turned into sheet row numbers
+async def _importStats(file, file_format: str, model, prepare, collection, recordId, onInserted, onRemoved, clearKeys=()):
+    async def writeBatch(models: list, row_numbers: list[int]):
+        rows, skipped = prepare(models)
+        result = await _bulkWriteStats(collection, rows, skipped, recordId, onInserted, onRemoved, clearKeys)
+        for entry in result["skipped"] + result["failed"]:
+            entry["row"] = row_numbers[entry.pop("index")]
+        return result
+    report = await import_sheet(file, file_format, model, writeBatch)
+    written = report["inserted"] + report["updated"]
+    if not written:
+        return {"error": "No valid records were inserted!", **report}
+    if written < report["rows"]:
+        return {"message": f"Imported {written} of {report['rows']} row(s); see invalid, skipped and failed for the rest.", **report}
+    return {"message": "Data imported successfully!", **report}
 
 # Placement Stats Services
 
-# Returns Placement Stats Data (including any filters)
-async def getPlacementStatsData(filters: dict):
-    if filters:
-        if len(filters)==1:
-            key,value = next(iter(filters.items()))
-            conditions={key:{"$eq":value}}
-        else:
-            conditions = {"$and": [{key: {"$eq": value}} for key, value in filters.items()]}
-    else:
-        conditions = {}
-    totalData = await asyncio.to_thread(
-        lambda: placement_stats_collection.get(where=conditions) if filters else placement_stats_collection.get()
+# Returns a page of Placement Stats Data (including any filters) and the total number of matches
+async def getPlacementStatsData(filters: dict, page: dict | None = None):
+    page = page or {}
+    records, total = await fetch_page(
+        placement_stats_collection,
+        build_where(filters),
+        page.get("limit"),
+        page.get("offset", 0),
+        page.get("sort")
     )
-    metadatas=totalData.get("metadatas",[])
-    ids=totalData.get("ids",[])
-    combinedData=[
-        {**metadata,"id":entry_id} for metadata,entry_id in zip(metadatas,ids)
-    ]
-    return combinedData
+    fields = page.get("fields")
+    return [project(record, fields) for record in records], total
+
+# Streams all Placement Stats Data (including any filters) page by page for export,
+# together with the export columns
+def exportPlacementStatsData(filters: dict):
+    return iter_record_pages(placement_stats_collection, build_where(filters)), ["id", *PlacementStatsModel.model_fields]
+
+# Validates and cleans bulk Placement Stats Data up front, returning the writable rows and the skipped ones
+def _preparePlacementStats(data_list: list[PlacementStatsModel]):
+    rows, skipped = [], []
+    for index, data in enumerate(data_list):
+        entryDict = data.model_dump()
+        entryDict["branch"] = entryDict["branch"].strip()
+        if not entryDict["branch"]:
+            skipped.append({"index": index, "reason": "Branch is empty."})
+            continue
+        if any(value < 0 for value in entryDict.values() if isinstance(value, (int, float))):
+            skipped.append({"index": index, "reason": "Negative values are not allowed."})
+            continue
+        rows.append((index, entryDict))
+    return rows, skipped
 
 # Adds bulk Placement Stats Data at a time
 async def enterPlacementStatsData(data_list : list[PlacementStatsModel]):
     if not data_list:
         return{"error":"No data provided!"}
-    insertedIds=[]
-    for data in data_list:
-        unqId=str(uuid.uuid4())
-        entryDict=data.model_dump()
-        await asyncio.to_thread(
-            placement_stats_collection.add,
-            documents=[str(entryDict)],
-            metadatas=[entryDict],
-            ids=[unqId]
-        )
-        insertedIds.append(unqId)
-    return {"message":"All data added successfully!","ids":insertedIds}
+    rows, skipped = _preparePlacementStats(data_list)
+    report = await _bulkWriteStats(
+        placement_stats_collection, rows, skipped, _placementStatsId, _onPlacementStatsAdded, _onPlacementStatsRemoved
+    )
+    if not report["ids"]:
+        return {"error": "No valid records were inserted!", **report}
+    return {"message": write_message(len(report["ids"]), len(data_list)), **report}
+
+# Imports Placement Stats Data from an uploaded CSV/XLSX file
+async def importPlacementStatsData(file, file_format: str):
+    return await _importStats(
+        file, file_format, PlacementStatsModel, _preparePlacementStats,
+        placement_stats_collection, _placementStatsId, _onPlacementStatsAdded, _onPlacementStatsRemoved
+    )
 
-# Adds a single Placement Stats Data
+# Adds (or replaces) a single Placement Stats Data, keyed on branch and year
 async def addPlacementStatsData(data: PlacementStatsModel):
-    unqId = str(uuid.uuid4())
     entryDict = data.model_dump()
-    await asyncio.to_thread(
-        placement_stats_collection.add,
-        documents=[str(entryDict)],
-        metadatas=[entryDict],
-        ids=[unqId]
+    report = await _bulkWriteStats(
+        placement_stats_collection, [(0, entryDict)], [], _placementStatsId, _onPlacementStatsAdded, _onPlacementStatsRemoved
     )
-    return {"message": "Data added successfully!", "id": unqId}
+    if report["failed"]:
+        raise Exception(report["failed"][0]["error"])
+    return {"message": "Data added successfully!", "id": report["ids"][0], "updated": bool(report["updated"])}
 
 # Deletes a Placement Stats Record (including filters)
 async def deletePlacementStatsData(filters:dict):
@@ -61,24 +196,16 @@ async def deletePlacementStatsData(filters:dict):
 
     entry_id = filters.get("entry_id")
     if entry_id:
-        storedData = await asyncio.to_thread(placement_stats_collection.get, ids=[entry_id])
-        if not storedData.get("ids"):
+        result = await bulk_delete(placement_stats_collection, ids=[entry_id], on_deleted=_onPlacementStatsRemoved)
+        if not result["ids"]:
             return {"error": "Entry not found!"}
-        await asyncio.to_thread(placement_stats_collection.delete, ids=[entry_id])
         return {"message": "Entry deleted successfully!", "id": entry_id}
-    
-    query_filters = {}
-    if "year" in filters and "branch" in filters:
-        query_filters = {"$and": [{"year": {"$eq": filters["year"]}}, {"branch": {"$eq": filters["branch"]}}]}
-    elif "year" in filters:
-        query_filters = {"year": {"$eq": filters["year"]}}
-    elif "branch" in filters:
-        query_filters = {"branch": {"$eq": filters["branch"]}}
-    storedData = await asyncio.to_thread(lambda: placement_stats_collection.get(where=query_filters))
-    if not storedData.get("ids"):
+
+    query_filters = {key: filters[key] for key in ("year", "branch") if key in filters}
+    result = await bulk_delete(placement_stats_collection, filters=[query_filters], on_deleted=_onPlacementStatsRemoved)
+    if not result["ids"]:
         return {"error": "No matching records found for the provided filters."}
-    ids_to_delete = storedData.get("ids")
-    await asyncio.to_thread(placement_stats_collection.delete, ids=ids_to_delete)
+    ids_to_delete = result["ids"]
     return {
         "message": f"Deleted {len(ids_to_delete)} record(s) successfully!",
         "deleted_ids": ids_to_delete
@@ -86,82 +213,104 @@ async def deletePlacementStatsData(filters:dict):
 
 # Deletes all Placement Stats Records at a time
 async def deleteAllPlacementStatsData():
-    storedData = await asyncio.to_thread(placement_stats_collection.get)
-    if not storedData.get("ids"):
+    deleted = await delete_all(placement_stats_collection, on_cleared=_onPlacementStatsCleared)
+    if not deleted:
         return {"error": "No data found!"}
-    await asyncio.to_thread(placement_stats_collection.delete, where={"year": {"$gte": 0}})
-    return {"message": "All data deleted successfully!"}
+    return {"message": "All data deleted successfully!", "deleted": deleted}
+
+# Deletes Placement Stats Records by ids and/or filter sets (branch, year) at a time
+async def bulkDeletePlacementStatsData(ids: list, filters: list):
+    return await _bulkDeleteStats(placement_stats_collection, ids, filters, PLACEMENT_DELETE_FIELDS, _onPlacementStatsRemoved)
+
+
+# Returns the Placement Analytics Summary (per-year and per-branch rates, offers and salaries)
+async def getPlacementAnalytics(filters: dict):
+    await placement_summary.ensure_loaded()
+    return placement_summary.snapshot(filters.get("year"), filters.get("branch"))
 
 
 # Company Stats Services
 
-# Returns Company Stats Data (including any filters)
-async def getCompanyStatsData(filters: dict):
+# Returns a page of Company Stats Data (including any filters) and the total number of matches
+async def getCompanyStatsData(filters: dict, page: dict | None = None):
+    page = page or {}
     branch = filters.pop("branch", None)
-    if not filters:
-        conditions = {}
-    elif len(filters) == 1:
-        key, value = next(iter(filters.items()))
-        conditions = {key: {"$eq": value}}
-    else:
-        conditions = {"$and": [{key: {"$eq": value}} for key, value in filters.items()]}
-    totalData = await asyncio.to_thread(
-        lambda: company_stats_collection.get(where=conditions) if filters else company_stats_collection.get()
+    records, total = await fetch_page(
+        company_stats_collection,
+        build_where(filters),
+        page.get("limit"),
+        page.get("offset", 0),
+        page.get("sort")
     )
-    metadatas = totalData.get("metadatas", [])
-    ids = totalData.get("ids", [])
+    fields = page.get("fields")
     processedData = []
-    for metadata, entry_id in zip(metadatas, ids):
-        if branch and branch in metadata:
-            filtered_metadata = {
-                "company_name": metadata.get("company_name"),
-                "internship_ppo": metadata.get("internship_ppo"),
-                "salary": metadata.get("salary"),
-                branch: metadata.get(branch, 0),
-                "total_offers": metadata.get("total_offers"),
-                "year": metadata.get("year"),
-                "id": entry_id
+    for record in records:
+        if branch and branch in record:
+            record = {
+                "company_name": record.get("company_name"),
+                "internship_ppo": record.get("internship_ppo"),
+                "salary": record.get("salary"),
+                branch: record.get(branch, 0),
+                "total_offers": record.get("total_offers"),
+                "year": record.get("year"),
+                "id": record["id"]
             }
-            processedData.append(filtered_metadata)
-        else:
-            processedData.append({**metadata, "id": entry_id})
-    return processedData
+        processedData.append(project(record, fields))
+    return processedData, total
 
-# Adds bulk Company Stats Data at a time
-async def enterCompanyStatsData(data_list: list[CompanyStatsModel]):
-    if not data_list:
-        return {"error": "No data provided!"}
-    insertedIds = []
-    for data in data_list:
+# Streams all Company Stats Data (including any filters) page by page for export,
+# together with the export columns
+def exportCompanyStatsData(filters: dict):
+    return iter_record_pages(company_stats_collection, build_where(filters)), ["id", *CompanyStatsModel.model_fields]
+
+# Validates and cleans bulk Company Stats Data up front, returning the writable rows and the skipped ones
+def _prepareCompanyStats(data_list: list[CompanyStatsModel]):
+    rows, skipped = [], []
+    for index, data in enumerate(data_list):
         entryDict = data.model_dump()
         cleanedData = {k: v for k, v in entryDict.items() if v is not None}
+        cleanedData["company_name"] = cleanedData["company_name"].strip()
+        if not cleanedData["company_name"]:
+            skipped.append({"index": index, "reason": "Company name is empty."})
+            continue
         if "internship_ppo" not in cleanedData and "salary" not in cleanedData:
+            skipped.append({"index": index, "reason": "Either internship_ppo or salary must be provided."})
             continue
-        unqId = str(uuid.uuid4())
-        await asyncio.to_thread(
-            company_stats_collection.add,
-            documents=[str(cleanedData)],
-            metadatas=[cleanedData],
-            ids=[unqId]
-        )
-        insertedIds.append(unqId)
-    if not insertedIds:
-        return {"error": "No valid records were inserted!"}
-    return {"message": "All data added successfully!", "ids": insertedIds}
+        rows.append((index, cleanedData))
+    return rows, skipped
 
+# Adds bulk Company Stats Data at a time
+async def enterCompanyStatsData(data_list: list[CompanyStatsModel]):
+    if not data_list:
+        return {"error": "No data provided!"}
+    rows, skipped = _prepareCompanyStats(data_list)
+    report = await _bulkWriteStats(
+        company_stats_collection, rows, skipped, _companyStatsId, _onCompanyStatsAdded, _onCompanyStatsRemoved,
+        COMPANY_STATS_FIELDS
+    )
+    if not report["ids"]:
+        return {"error": "No valid records were inserted!", **report}
+    return {"message": write_message(len(report["ids"]), len(data_list)), **report}
 
-# Adds a single Company Stats Data
+# Imports Company Stats Data from an uploaded CSV/XLSX file
+async def importCompanyStatsData(file, file_format: str):
+    return await _importStats(
+        file, file_format, CompanyStatsModel, _prepareCompanyStats,
+        company_stats_collection, _companyStatsId, _onCompanyStatsAdded, _onCompanyStatsRemoved,
+        COMPANY_STATS_FIELDS
+    )
+
+# Adds (or replaces) a single Company Stats Data, keyed on company name and year
 async def addCompanyStatsData(data: CompanyStatsModel):
-    unqId = str(uuid.uuid4())
     entryDict = data.model_dump()
     cleanedData = {k: v for k, v in entryDict.items() if v is not None}
-    await asyncio.to_thread(
-        company_stats_collection.add,
-        documents=[str(cleanedData)],
-        metadatas=[cleanedData],
-        ids=[unqId]
+    report = await _bulkWriteStats(
+        company_stats_collection, [(0, cleanedData)], [], _companyStatsId, _onCompanyStatsAdded, _onCompanyStatsRemoved,
+        COMPANY_STATS_FIELDS
     )
-    return {"message": "Data added successfully!", "id": unqId}
+    if report["failed"]:
+        raise Exception(report["failed"][0]["error"])
+    return {"message": "Data added successfully!", "id": report["ids"][0], "updated": bool(report["updated"])}
 
 # Deletes a Company Stats Record (including filters)
 async def deleteCompanyStatsData(filters: dict):
@@ -170,24 +319,16 @@ async def deleteCompanyStatsData(filters: dict):
 
     entry_id = filters.get("entry_id")
     if entry_id:
-        storedData = await asyncio.to_thread(company_stats_collection.get, ids=[entry_id])
-        if not storedData.get("ids"):
+        result = await bulk_delete(company_stats_collection, ids=[entry_id], on_deleted=_onCompanyStatsRemoved)
+        if not result["ids"]:
             return {"error": "Entry not found!"}
-        await asyncio.to_thread(company_stats_collection.delete, ids=[entry_id])
         return {"message": "Entry deleted successfully!", "id": entry_id}
-    
-    query_filters = {}
-    if "year" in filters and "company_name" in filters:
-        query_filters = {"$and": [{"year": {"$eq": filters["year"]}}, {"company_name": {"$eq": filters["company_name"]}}]}
-    elif "year" in filters:
-        query_filters = {"year": {"$eq": filters["year"]}}
-    elif "company_name" in filters:
-        query_filters = {"company_name": {"$eq": filters["company_name"]}}
-    storedData = await asyncio.to_thread(lambda: company_stats_collection.get(where=query_filters))
-    if not storedData.get("ids"):
+
+    query_filters = {key: filters[key] for key in ("year", "company_name") if key in filters}
+    result = await bulk_delete(company_stats_collection, filters=[query_filters], on_deleted=_onCompanyStatsRemoved)
+    if not result["ids"]:
         return {"error": "No matching records found for the provided filters."}
-    ids_to_delete = storedData.get("ids")
-    await asyncio.to_thread(company_stats_collection.delete, ids=ids_to_delete)
+    ids_to_delete = result["ids"]
     return {
         "message": f"Deleted {len(ids_to_delete)} record(s) successfully!",
         "deleted_ids": ids_to_delete
@@ -195,9 +336,29 @@ async def deleteCompanyStatsData(filters: dict):
 
 # Deletes all Company Stats Records at a time
 async def deleteAllCompanyStatsData():
-    storedData = await asyncio.to_thread(company_stats_collection.get)
-    if not storedData.get("ids"):
+    deleted = await delete_all(company_stats_collection, on_cleared=_onCompanyStatsCleared)
+    if not deleted:
         return {"error": "No data found!"}
-    
-    await asyncio.to_thread(company_stats_collection.delete, where={"year": {"$gte": 0}})
-    return {"message": "All data deleted successfully!"}
+    return {"message": "All data deleted successfully!", "deleted": deleted}
+
+# Deletes Company Stats Records by ids and/or filter sets (company_name, year) at a time
+async def bulkDeleteCompanyStatsData(ids: list, filters: list):
+    return await _bulkDeleteStats(company_stats_collection, ids, filters, COMPANY_DELETE_FIELDS, _onCompanyStatsRemoved)
+
+
+# Company Stats Aggregates (served from the columnar snapshot)
+
+# Returns the top-N companies by salary, total offers or internship PPOs
+async def getTopCompanies(n: int, by: str, year: int | None = None):
+    await company_stats_snapshot.ensure_loaded()
+    return company_stats_snapshot.top_companies(n, by, year)
+
+# Returns branch-wise offer totals per year and across the selected years
+async def getBranchOfferTotals(from_year: int | None = None, to_year: int | None = None):
+    await company_stats_snapshot.ensure_loaded()
+    return company_stats_snapshot.branch_offer_totals(from_year, to_year)
+
+# Returns salary percentiles, overall or for one year
+async def getSalaryPercentiles(percentiles: list[float], year: int | None = None):
+    await company_stats_snapshot.ensure_loaded()
+    return company_stats_snapshot.salary_percentiles(percentiles, year)
@@ -0,0 +1,63 @@
+# Tests run from the backend folder: python -m pytest tests
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Settings the modules read at import time
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+os.environ.setdefault("JWT_ALGORITHM", "HS256")
+os.environ.setdefault("JWT_EXPIRATION_TIME", "30")
+os.environ.setdefault("EMBEDDING_BACKEND", "hashing")
+os.environ.setdefault("CHATBOT_MODEL", "fake")
+os.environ.setdefault("SPACY_MODEL", "en_core_web_md")
+
+# database.py keeps the Chroma data (and the BM25 index next to it) under a relative path, so the
+# tests run from a scratch directory instead of writing into the backend's own db folder
+os.chdir(tempfile.mkdtemp(prefix="placements-tests-"))
+
+
+# scripts/fake_ollama.py on a free port, with utils.llm pointed at it. The handler class is a
+# per-test copy, so tests can change its delay and fail_after.
+@pytest.fixture
+def fake_ollama(monkeypatch):
+    from scripts.fake_ollama import FakeOllamaHandler
+    from utils import llm
+
+    handler = type("FakeOllamaHandler", (FakeOllamaHandler,), {"delay": 0, "fail_after": None})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(llm, "CHATBOT_URL", f"http://127.0.0.1:{server.server_address[1]}/api/generate")
+    monkeypatch.setattr(llm, "LLM_RETRY_BACKOFF", 0)
+    # The semaphore and the pooled client bind to the event loop of each test
+    monkeypatch.setattr(llm, "_semaphore", asyncio.Semaphore(llm.LLM_MAX_CONCURRENCY))
+    monkeypatch.setattr(llm, "_client", None)
+    yield handler
+    server.shutdown()
+    server.server_close()
+
+
+# The FastAPI app (lifespan included) with authentication switched off and Redis left out
+@pytest.fixture
+def api_client(monkeypatch):
+    # The app imports the chatbot pipeline, which needs spaCy and its model
+    pytest.importorskip("spacy")
+    from fastapi.testclient import TestClient
+    from app import create_app
+    from utils import cache
+    from utils.auth_utils import verify_token
+
+    monkeypatch.setattr(cache, "redis_client", None)
+    monkeypatch.setattr(cache, "memory_cache", cache.TTLCache())
+    app = create_app()
+    app.dependency_overrides[verify_token] = lambda: None
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,57 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from utils import cache
+
+
+# A listening socket that is never accepted: connects succeed, reads never return
+@pytest.fixture
+def blackhole():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(64)
+    yield server.getsockname()[1]
+    server.close()
+
+
+@pytest.fixture
+def unreachable_redis(blackhole, monkeypatch):
+    monkeypatch.setattr(cache, "redis_client", cache.make_redis_client("127.0.0.1", blackhole))
+    monkeypatch.setattr(cache, "redis_breaker", cache.CircuitBreaker(threshold=2, cooldown=60))
+    monkeypatch.setattr(cache, "memory_cache", cache.TTLCache())
+
+
+def test_unreachable_redis_falls_back_within_timeout(unreachable_redis):
+    async def lookup():
+        started = time.perf_counter()
+        response = await cache.get_cached_response("what is the tcs package?")
+        return response, time.perf_counter() - started
+
+    response, elapsed = asyncio.run(lookup())
+    assert response is None
+    assert elapsed < 1.0
+
+
+def test_breaker_bypasses_redis_once_open(unreachable_redis):
+    async def lookups():
+        for index in range(2):
+            await cache.get_cached_response(f"query {index}")
+        started = time.perf_counter()
+        await cache.get_cached_response("query 3")
+        return time.perf_counter() - started
+
+    assert asyncio.run(lookups()) < 0.05
+    assert cache.redis_breaker.state == "open"
+
+
+def test_half_open_breaker_lets_one_trial_through():
+    breaker = cache.CircuitBreaker(threshold=1, cooldown=0.01)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.02)
+    assert [breaker.allow() for _ in range(3)] == [True, False, False]
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("spacy")
+
+from scripts.fake_ollama import CANNED_TOKENS
+from services import chatbot_service
+from utils import cache, llm
+from utils.semantic_cache import SemanticCache
+
+
+# Fresh answer caches (Redis left out) and a count of the LLM generations started
+@pytest.fixture
+def generations(fake_ollama, monkeypatch):
+    monkeypatch.setattr(cache, "redis_client", None)
+    monkeypatch.setattr(cache, "memory_cache", cache.TTLCache())
+    monkeypatch.setattr(chatbot_service, "semantic_cache", SemanticCache())
+    fake_ollama.delay = 0.01
+    started = []
+    stream, query = chatbot_service.stream_ollama, chatbot_service.query_ollama
+
+    def counted_stream(prompt):
+        started.append("stream")
+        return stream(prompt)
+
+    async def counted_query(prompt):
+        started.append("query")
+        return await query(prompt)
+
+    monkeypatch.setattr(chatbot_service, "stream_ollama", counted_stream)
+    monkeypatch.setattr(chatbot_service, "query_ollama", counted_query)
+    return started
+
+
+async def _stream(query: str) -> list[tuple[str, dict]]:
+    return [event async for event in chatbot_service.stream_chatbot_answer(query)]
+
+
+def _run(*coros):
+    async def main():
+        try:
+            return await asyncio.gather(*coros)
+        finally:
+            await llm.close_llm_client()
+    return asyncio.run(main())
+
+
+def test_identical_streams_share_one_generation(generations):
+    results = _run(*(_stream("Explain the interview process at Globex") for _ in range(5)))
+    assert generations == ["stream"]
+    for events in results:
+        assert [data["token"] for event, data in events if event == "token"] == CANNED_TOKENS
+        assert events[-1] == ("done", results[0][-1][1])
+    assert results[0][-1][1]["answer"] == "".join(CANNED_TOKENS)
+
+
+def test_non_streaming_duplicates_join_a_stream(generations):
+    query = "Explain the hiring rounds at Umbrella"
+    events, answer = _run(_stream(query), chatbot_service.get_chatbot_answer(query))
+    assert generations == ["stream"]
+    assert answer == events[-1][1]
+
+
+def test_identical_answers_share_one_generation(generations):
+    query = "What is the package offered by Hooli"
+    answers = _run(*(chatbot_service.get_chatbot_answer(query) for _ in range(4)))
+    assert generations == ["query"]
+    assert all(answer == answers[0] for answer in answers)
@@ -0,0 +1,45 @@
+import json
+
+from scripts.fake_ollama import CANNED_TOKENS
+from utils import llm
+
+
+# (event, data) pairs of a Server-Sent Events body
+def _events(response) -> list[tuple[str, dict]]:
+    events, event = [], None
+    for line in response.iter_lines():
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            events.append((event, json.loads(line[len("data: "):])))
+    return events
+
+
+def _stream(client, query: str) -> list[tuple[str, dict]]:
+    with client.stream("GET", "/chatbot/stream-chatbot-answer", params={"query": query}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        return _events(response)
+
+
+def test_stream_sends_tokens_then_the_full_answer(api_client, fake_ollama):
+    events = _stream(api_client, "Explain the interview process at Zoho")
+    tokens = [data["token"] for event, data in events if event == "token"]
+    assert tokens == CANNED_TOKENS
+    assert events[-1][0] == "done"
+    assert events[-1][1]["answer"] == "".join(CANNED_TOKENS)
+    assert events[-1][1]["source"] == "llm"
+
+
+def test_mid_stream_failure_ends_with_the_error_message(api_client, fake_ollama):
+    fake_ollama.fail_after = 2
+    events = _stream(api_client, "Explain the interview rounds at Initech")
+    tokens = [data["token"] for event, data in events if event == "token"]
+    assert tokens == CANNED_TOKENS[:2] + [llm.CONNECTION_MESSAGE]
+    assert events[-1] == ("done", {**events[-1][1], "answer": "".join(tokens)})
+
+
+def test_greeting_is_answered_without_the_llm(api_client, fake_ollama):
+    events = _stream(api_client, "hello")
+    assert [event for event, _ in events] == ["done"]
+    assert events[0][1]["source"] == "rule-based"
@@ -0,0 +1,88 @@
+import pytest
+
+
+def placement_row(branch: str, year: int, **values) -> dict:
+    row = {
+        "branch": branch, "selected_male": 30, "selected_female": 20, "selected_total": 50,
+        "class_total": 100, "registered": 90, "not_registered": 10, "not_eligible": 5, "eligible": 85,
+        "single_offers": 40, "multiple_offers": 10, "total_offers": 60, "total_percentage_single": 40.0,
+        "year": year,
+    }
+    return {**row, **values}
+
+
+ROWS = [
+    placement_row("CSE", 2023, total_offers=90),
+    placement_row("ECE", 2023, total_offers=40),
+    placement_row("IT", 2024, total_offers=70),
+    placement_row("MECH", 2024, total_offers=20),
+    placement_row("CIVIL", 2024, total_offers=10),
+]
+
+
+@pytest.fixture
+def placement_stats(api_client):
+    api_client.delete("/dashboard/delete-all-records")
+    response = api_client.post("/dashboard/add-all-data", json=ROWS)
+    assert response.status_code == 200
+    return api_client
+
+
+def test_paging_sorting_and_projection(placement_stats):
+    response = placement_stats.get("/dashboard/get-data", params={"sort": "-total_offers", "limit": 2, "offset": 1})
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == "5"
+    assert [record["branch"] for record in response.json()] == ["IT", "ECE"]
+
+    response = placement_stats.get("/dashboard/get-data", params={"year": 2024, "fields": "branch", "limit": 10})
+    assert response.headers["X-Total-Count"] == "3"
+    assert sorted(record["branch"] for record in response.json()) == ["CIVIL", "IT", "MECH"]
+    assert all(set(record) == {"id", "branch"} for record in response.json())
+
+
+def test_limit_without_sort_is_bounded(placement_stats):
+    response = placement_stats.get("/dashboard/get-data", params={"limit": 2})
+    assert len(response.json()) == 2
+    assert response.headers["X-Total-Count"] == "5"
+    response = placement_stats.get("/dashboard/get-data", params={"limit": 2, "offset": 4})
+    assert len(response.json()) == 1
+
+
+def test_etag_answers_304_until_the_collection_changes(placement_stats):
+    first = placement_stats.get("/dashboard/get-data", params={"year": 2024})
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+
+    cached = placement_stats.get("/dashboard/get-data", params={"year": 2024}, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    # Other query arguments have their own entity tag
+    other = placement_stats.get("/dashboard/get-data", params={"year": 2023}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+
+    placement_stats.post("/dashboard/add-data", json=placement_row("EEE", 2024))
+    changed = placement_stats.get("/dashboard/get-data", params={"year": 2024}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.headers["X-Total-Count"] == "4"
+
+
+def test_reposting_a_record_updates_it_in_place(placement_stats):
+    ids = placement_stats.get("/dashboard/get-data", params={"branch": "CSE", "year": 2023}).json()
+    assert len(ids) == 1
+
+    response = placement_stats.post("/dashboard/add-all-data", json=[
+        placement_row("cse ", 2023, total_offers=95),
+        placement_row("AIML", 2023),
+    ])
+    report = response.json()
+    assert (report["inserted"], report["updated"]) == (1, 1)
+    assert ids[0]["id"] in report["ids"]
+
+    single = placement_stats.post("/dashboard/add-data", json=placement_row("CSE", 2023, total_offers=99)).json()
+    assert single["updated"] is True and single["id"] == ids[0]["id"]
+
+    stored = placement_stats.get("/dashboard/get-data", params={"year": 2023}).json()
+    assert len(stored) == 3
+    assert [record["total_offers"] for record in stored if record["id"] == ids[0]["id"]] == [99]
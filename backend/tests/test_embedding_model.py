@@ -0,0 +1,25 @@
+import threading
+import time
+
+from utils import embedding_model
+
+
+def test_concurrent_first_use_loads_the_model_once(monkeypatch):
+    created = []
+
+    def slow_backend(name):
+        time.sleep(0.05)
+        created.append(name)
+        return object()
+
+    monkeypatch.setattr(embedding_model, "_model", None)
+    monkeypatch.setattr(embedding_model, "create_embedding_backend", slow_backend)
+    models = []
+    workers = [threading.Thread(target=lambda: models.append(embedding_model.get_embedding_model())) for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert len(created) == 1
+    assert len(models) == 8 and all(model is models[0] for model in models)
@@ -0,0 +1,50 @@
+import asyncio
+
+from scripts.fake_ollama import CANNED_TOKENS
+from utils import llm
+
+
+async def _collect(prompt: str = "prompt") -> list[str]:
+    return [token async for token in llm.stream_ollama(prompt, "fake")]
+
+
+# Runs a test body on a fresh event loop and closes the pooled client bound to it
+def _run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await llm.close_llm_client()
+    return asyncio.run(main())
+
+
+def test_stream_yields_the_generated_tokens_in_order(fake_ollama):
+    assert _run(_collect()) == CANNED_TOKENS
+
+
+def test_mid_stream_failure_appends_the_error_message(fake_ollama):
+    fake_ollama.fail_after = 3
+    # Tokens already sent are kept; the stream is not retried once it has started
+    assert _run(_collect()) == CANNED_TOKENS[:3] + [llm.CONNECTION_MESSAGE]
+
+
+def test_queue_timeout_answers_busy(fake_ollama, monkeypatch):
+    monkeypatch.setattr(llm, "_semaphore", asyncio.Semaphore(1))
+    monkeypatch.setattr(llm, "LLM_QUEUE_TIMEOUT", 0.1)
+    fake_ollama.delay = 0.05
+
+    async def both():
+        # The first stream holds the only slot for the whole generation (about 0.5s)
+        first = asyncio.ensure_future(_collect())
+        await asyncio.sleep(0.02)
+        second = await _collect()
+        return await first, second
+
+    first, second = _run(both())
+    assert first == CANNED_TOKENS
+    assert second == [llm.BUSY_MESSAGE]
+    assert llm.llm_stats()["rejected"] >= 1
+
+
+def test_non_streaming_query_returns_the_full_answer(fake_ollama):
+    assert _run(llm.query_ollama("prompt", "fake")) == "".join(CANNED_TOKENS)
@@ -0,0 +1,206 @@
+# In-process BM25 inverted index over the company insights documents, patched on every insights
+# write and persisted next to the Chroma data so restarts do not re-tokenize the collection
+import asyncio
+import heapq
+import math
+import os
+import re
+from collections import Counter, defaultdict
+import orjson
+from dotenv import load_dotenv
+from database import DB_PATH, company_insights_collection
+
+load_dotenv()
+
+BM25_K1 = float(os.getenv("BM25_K1", 1.5))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+# Seconds a write waits before the index is persisted; writes in the meantime share one save
+BM25_SAVE_DELAY = float(os.getenv("BM25_SAVE_DELAY", 2))
+INDEX_FORMAT = 1
+
+_TERM_RE = re.compile(r"[a-z0-9]+(?:[+#]+|\.[a-z0-9]+)*")
+
+# Lowercased word terms; keeps "c++", "c#" and "node.js" whole
+def tokenize(text: str) -> list[str]:
+    return _TERM_RE.findall((text or "").lower())
+
+class BM25Index:
+    def __init__(self, collection, path: str):
+        self.collection = collection
+        self.path = path
+        self.loaded = False
+        self.writes = 0
+        self._lock = asyncio.Lock()
+        self._dirty = False
+        self._saving = False
+        self._save_task = None
+        self._reset()
+
+    def _reset(self):
+        self.postings = defaultdict(dict)   # term -> {doc id: term frequency}
+        self.terms = {}                     # doc id -> Counter of its terms, needed to unindex it
+        self.lengths = {}                   # doc id -> number of terms
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _index(self, doc_id: str, counts: Counter):
+        self.terms[doc_id] = counts
+        self.lengths[doc_id] = sum(counts.values())
+        self.total_length += self.lengths[doc_id]
+        for term, frequency in counts.items():
+            self.postings[term][doc_id] = frequency
+
+    def _add(self, ids: list, documents: list[str]):
+        for doc_id, document in zip(ids, documents):
+            if doc_id in self.terms:
+                self._remove([doc_id])
+            self._index(doc_id, Counter(tokenize(document)))
+
+    def _remove(self, ids: list):
+        for doc_id in ids:
+            counts = self.terms.pop(doc_id, None)
+            if counts is None:
+                continue
+            self.total_length -= self.lengths.pop(doc_id)
+            for term in counts:
+                postings = self.postings[term]
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+
+    # Top-k (doc id, score) pairs for the query
+    def search(self, query: str, k: int = 10) -> list[tuple[str, float]]:
+        count = len(self.terms)
+        if not count:
+            return []
+        average_length = self.total_length / count
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[doc_id] / average_length)
+                scores[doc_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    # Persistence: one JSON file of per-document term counts; postings are rebuilt on load
+    def _serialize(self) -> bytes:
+        return orjson.dumps({"format": INDEX_FORMAT, "docs": self.terms})
+
+    def _write(self, payload: bytes):
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(payload)
+        os.replace(temporary, self.path)
+
+    def _read(self) -> dict | None:
+        try:
+            with open(self.path, "rb") as file:
+                data = orjson.loads(file.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, orjson.JSONDecodeError) as e:
+            print(f"[WARN] Ignoring unreadable BM25 index {self.path}: {e}")
+            return None
+        return data if data.get("format") == INDEX_FORMAT else None
+
+    def _discard_file(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    # Writes the index to disk. Saves requested while one is running are folded into one more pass.
+    async def save(self):
+        if not self.loaded:
+            return
+        self._dirty = True
+        if self._saving:
+            return
+        self._saving = True
+        try:
+            while self._dirty:
+                self._dirty = False
+                await asyncio.to_thread(self._write, self._serialize())
+        finally:
+            self._saving = False
+
+    # Debounced save for the write hooks, which run synchronously under the collection lock. The
+    # persisted file is dropped until then, so a crash in between leads to a rebuild, not a stale index.
+    def schedule_save(self):
+        if self.loaded and self._save_task is None:
+            self._discard_file()
+            self._save_task = asyncio.get_running_loop().create_task(self._delayed_save())
+
+    async def _delayed_save(self):
+        await asyncio.sleep(BM25_SAVE_DELAY)
+        self._save_task = None
+        await self.save()
+
+    # Writes a pending save at once (on shutdown)
+    async def flush(self):
+        if self._save_task is None:
+            return
+        self._save_task.cancel()
+        self._save_task = None
+        await self.save()
+
+    # Loads the persisted index if it still matches the collection, otherwise rebuilds it from
+    # the stored documents. If a write lands while the collection is being read, the read is repeated.
+    async def ensure_loaded(self):
+        if self.loaded:
+            return
+        async with self._lock:
+            while not self.loaded:
+                writes = self.writes
+                data, count = await asyncio.gather(
+                    asyncio.to_thread(self._read), asyncio.to_thread(self.collection.count)
+                )
+                rebuilt = data is None or len(data["docs"]) != count
+                if rebuilt:
+                    stored = await asyncio.to_thread(self.collection.get, include=["documents"])
+                if writes != self.writes:
+                    continue
+                self._reset()
+                if rebuilt:
+                    self._add(stored.get("ids") or [], stored.get("documents") or [])
+                else:
+                    for doc_id, counts in data["docs"].items():
+                        self._index(doc_id, Counter(counts))
+                self.loaded = True
+                if rebuilt:
+                    await self.save()
+
+    # Write hooks called by the insights services. Writes before the first load only drop the
+    # persisted file, so the next load rebuilds from the collection instead of trusting it.
+    def add(self, ids: list, documents: list[str]):
+        self.writes += 1
+        if self.loaded:
+            self._add(ids, documents)
+        else:
+            self._discard_file()
+
+    def remove(self, ids: list):
+        self.writes += 1
+        if self.loaded:
+            self._remove(ids)
+        else:
+            self._discard_file()
+
+    def clear(self):
+        self.writes += 1
+        if self.loaded:
+            self._reset()
+        else:
+            self._discard_file()
+
+    def get_stats(self) -> dict:
+        return {"loaded": self.loaded, "documents": len(self.terms), "terms": len(self.postings)}
+
+insights_index = BM25Index(
+    company_insights_collection, os.path.join(os.path.dirname(DB_PATH), "bm25_company_insights.json")
+)
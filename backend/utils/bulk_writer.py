@@ -0,0 +1,124 @@
+# Chunked bulk writes against a Chroma collection
+import asyncio
+from database import MAX_BATCH_SIZE
+from utils.listing import build_where
+
+# One lock per collection: the previous-record lookup and the upsert of a chunk (or the lookup
+# and delete of a delete) must not interleave with another write of the same ids, or the write
+# hooks would be fed records that were already replaced or removed. The hooks (on_written,
+# on_deleted, on_cleared) are synchronous and run before the lock is released, for the same reason.
+_locks: dict[str, asyncio.Lock] = {}
+
+def collection_lock(collection) -> asyncio.Lock:
+    return _locks.setdefault(collection.name, asyncio.Lock())
+
+# Message of a bulk add that wrote `written` of `total` records; partial writes say so, so a
+# client reading only the message does not miss the skipped and failed entries
+def write_message(written: int, total: int, noun: str = "record") -> str:
+    if written == total:
+        return "All data added successfully!"
+    return f"Added {written} of {total} {noun}(s); see skipped and failed for the rest."
+
+# Indexes of the last record of every id, and of the earlier records it replaces
+def last_occurrences(ids: list) -> tuple[list[int], list[int]]:
+    last = {entry_id: index for index, entry_id in enumerate(ids)}
+    keep = sorted(last.values())
+    kept = set(keep)
+    return keep, [index for index in range(len(ids)) if index not in kept]
+
+# Upserts records in chunks sized to the backend's maximum batch; ids must be unique.
+# Chroma merges the metadata of an existing record with the new one, so clear_keys missing from
+# a record's metadata are sent as None (which removes them) to replace it whole.
+# A chunk that fails is retried row by row so only the offending rows are reported as failed.
+# Returns the written ids, the failures and {id: previous metadata} of the records that were replaced;
+# on_written(written ids, previous) is called with the same values.
+async def bulk_upsert(collection, ids: list, documents: list, metadatas: list, embeddings: list | None = None,
+                      clear_keys=(), batch_size: int = MAX_BATCH_SIZE, on_written=None):
+    written, failed, previous = [], [], {}
+    async with collection_lock(collection):
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            chunk = {
+                "ids": ids[start:end],
+                "documents": documents[start:end],
+                "metadatas": [{**{key: None for key in clear_keys}, **metadata} for metadata in metadatas[start:end]],
+            }
+            if embeddings is not None:
+                chunk["embeddings"] = embeddings[start:end]
+            stored = await asyncio.to_thread(collection.get, ids=chunk["ids"], include=["metadatas"])
+            chunk_previous = dict(zip(stored["ids"], stored["metadatas"]))
+            try:
+                await asyncio.to_thread(collection.upsert, **chunk)
+                written.extend(chunk["ids"])
+            except Exception:
+                # Isolate the bad rows of this chunk in a single worker thread
+                row_results = await asyncio.to_thread(_upsert_row_by_row, collection, chunk)
+                for offset, error in enumerate(row_results):
+                    if error is None:
+                        written.append(chunk["ids"][offset])
+                    else:
+                        failed.append({"index": start + offset, "id": chunk["ids"][offset], "error": error})
+                        chunk_previous.pop(chunk["ids"][offset], None)
+            previous.update(chunk_previous)
+        if on_written is not None and written:
+            on_written(written, previous)
+    return written, failed, previous
+
+def _upsert_row_by_row(collection, chunk: dict):
+    errors = []
+    for offset in range(len(chunk["ids"])):
+        try:
+            collection.upsert(**{key: [values[offset]] for key, values in chunk.items()})
+            errors.append(None)
+        except Exception as e:
+            errors.append(str(e))
+    return errors
+
+# Deletes the records with the given ids and those matching any of the equality filters
+# ({"field": value, ...}). Matches are looked up once (ids and metadatas only, for the write hooks)
+# and deleted by id. Returns the deleted ids, their metadatas, the requested ids that did not exist
+# and the number of deleted records matching each filter. on_deleted(ids, metadatas) is called if any were.
+async def bulk_delete(collection, ids: list | None = None, filters: list[dict] | None = None,
+                      batch_size: int = MAX_BATCH_SIZE, on_deleted=None):
+    ids, filters = list(dict.fromkeys(ids or [])), [where for where in filters or [] if where]
+    stored = {}
+    async with collection_lock(collection):
+        if ids:
+            found = await asyncio.to_thread(collection.get, ids=ids, include=["metadatas"])
+            stored.update(zip(found["ids"], found["metadatas"]))
+        if filters:
+            clauses = [build_where(where) for where in filters]
+            where = clauses[0] if len(clauses) == 1 else {"$or": clauses}
+            found = await asyncio.to_thread(collection.get, where=where, include=["metadatas"])
+            stored.update(zip(found["ids"], found["metadatas"]))
+        deleted = list(stored)
+        for start in range(0, len(deleted), batch_size):
+            await asyncio.to_thread(collection.delete, ids=deleted[start:start + batch_size])
+        if on_deleted is not None and deleted:
+            on_deleted(deleted, list(stored.values()))
+    return {
+        "ids": deleted,
+        "metadatas": list(stored.values()),
+        "not_found": [entry_id for entry_id in ids if entry_id not in stored],
+        "filter_counts": [
+            sum(1 for metadata in stored.values() if all(metadata.get(key) == value for key, value in where.items()))
+            for where in filters
+        ],
+    }
+
+# Empties the collection page by page (ids only) and returns the number of records deleted.
+# The collection itself is kept, with its metadata (such as the embedding backend stamp).
+# on_cleared() is called if anything was deleted.
+async def delete_all(collection, batch_size: int = MAX_BATCH_SIZE, on_cleared=None) -> int:
+    deleted = 0
+    async with collection_lock(collection):
+        if not await asyncio.to_thread(collection.count):
+            return 0
+        while True:
+            page = await asyncio.to_thread(collection.get, limit=batch_size, include=[])
+            if not page["ids"]:
+                if on_cleared is not None and deleted:
+                    on_cleared()
+                return deleted
+            await asyncio.to_thread(collection.delete, ids=page["ids"])
+            deleted += len(page["ids"])
@@ -1,21 +1,170 @@
-# Caching mechanism using Redis
+# Two-tier answer cache: a bounded in-process TTL/LRU tier in front of Redis
+import asyncio
 import os
+import re
+import time
+from collections import OrderedDict
 from dotenv import load_dotenv
 
 load_dotenv()
 # dotenv: Used to load environment variables from a .env file into the Python environment.
 
-import redis
-# redis: Python library to interact with a Redis server (in-memory key-value database).
+import redis.asyncio as redis
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
+from redis.exceptions import RedisError
+# redis.asyncio: asyncio client for the Redis server (in-memory key-value database), so lookups never block the event loop.
 import json
 # json: Used to convert Python dictionaries to JSON strings and back — because Redis stores only strings or byte data.
 
-#  You're connecting to a Redis server running on REDIS_HOST on port REDIS_PORT, using database 0. Redis allows multiple logical databases — here, db=0 refers to the first one.
-redis_client = redis.Redis(host=os.getenv("REDIS_HOST"), port=os.getenv("REDIS_PORT"), db=0)
+REDIS_HOST = os.getenv("REDIS_HOST")
+REDIS_PORT = os.getenv("REDIS_PORT", 6379)
+CACHE_TTL = int(os.getenv("CACHE_TTL", 3600))
+CACHE_MEMORY_SIZE = int(os.getenv("CACHE_MEMORY_SIZE", 2048))
+# Redis is skipped for CACHE_REDIS_COOLDOWN seconds after CACHE_REDIS_FAILURE_THRESHOLD consecutive failures
+CACHE_REDIS_TIMEOUT = float(os.getenv("CACHE_REDIS_TIMEOUT", 0.5))
+CACHE_REDIS_FAILURE_THRESHOLD = int(os.getenv("CACHE_REDIS_FAILURE_THRESHOLD", 3))
+CACHE_REDIS_COOLDOWN = float(os.getenv("CACHE_REDIS_COOLDOWN", 30))
 
-def get_cached_response(query: str):
-    result = redis_client.get(query)
-    return json.loads(result) if result else None
+# Lowercases and collapses whitespace so trivially different spellings share one entry
+def normalize_key(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().lower()
 
-def set_cached_response(query: str, response: dict):
-    redis_client.set(query, json.dumps(response), ex=3600)
+class TTLCache:
+    # Bounded LRU where every entry also expires after ttl seconds
+    def __init__(self, maxsize: int = CACHE_MEMORY_SIZE, ttl: int = CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: int | None = None):
+        self.entries[key] = (value, time.monotonic() + (ttl or self.ttl))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def delete(self, key):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+class CircuitBreaker:
+    # Opens after `threshold` consecutive failures and lets one trial call through after `cooldown` seconds;
+    # other callers are turned away until the trial records its outcome. A trial that never reports back
+    # (cancelled, unexpected error) is given up on after another `cooldown`.
+    def __init__(self, threshold: int = CACHE_REDIS_FAILURE_THRESHOLD, cooldown: float = CACHE_REDIS_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state != "half-open":
+            return state == "closed"
+        now = time.monotonic()
+        if self.trial_started is not None and now - self.trial_started < self.cooldown:
+            return False
+        self.trial_started = now
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started = None
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_started = None
+        if self.failures >= self.threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+memory_cache = TTLCache()
+redis_breaker = CircuitBreaker()
+# redis-py retries connection errors and timeouts by default, which multiplies CACHE_REDIS_TIMEOUT;
+# a failing call is handed to the circuit breaker instead
+def make_redis_client(host: str, port=REDIS_PORT):
+    return redis.Redis(
+        host=host, port=port, db=0,
+        socket_timeout=CACHE_REDIS_TIMEOUT, socket_connect_timeout=CACHE_REDIS_TIMEOUT,
+        retry=Retry(NoBackoff(), 0)
+    )
+
+# Without REDIS_HOST the cache runs on the in-process tier alone (single node, tests)
+redis_client = make_redis_client(REDIS_HOST) if REDIS_HOST else None
+_stats = {"memory_hits": 0, "redis_hits": 0, "misses": 0, "redis_errors": 0, "redis_bypassed": 0}
+
+# Runs a Redis command through the circuit breaker; returns None when Redis is skipped or failing.
+# The whole call (connect, send, read) is bounded by CACHE_REDIS_TIMEOUT.
+async def _redis_call(command, *args, **kwargs):
+    if redis_client is None:
+        return None
+    if not redis_breaker.allow():
+        _stats["redis_bypassed"] += 1
+        return None
+    try:
+        result = await asyncio.wait_for(command(*args, **kwargs), CACHE_REDIS_TIMEOUT)
+        redis_breaker.record_success()
+        return result
+    except (RedisError, OSError, TimeoutError) as e:
+        _stats["redis_errors"] += 1
+        redis_breaker.record_failure()
+        print(f"[WARN] Redis unavailable, using in-process cache only: {e or type(e).__name__}")
+        return None
+
+async def get_cached_response(query: str):
+    key = normalize_key(query)
+    response = memory_cache.get(key)
+    if response is not None:
+        _stats["memory_hits"] += 1
+        return response
+    result = await _redis_call(redis_client.get, key) if redis_client else None
+    if result:
+        _stats["redis_hits"] += 1
+        response = json.loads(result)
+        memory_cache.set(key, response)
+        return response
+    _stats["misses"] += 1
+    return None
+
+async def set_cached_response(query: str, response: dict):
+    key = normalize_key(query)
+    memory_cache.set(key, response)
+    if redis_client:
+        await _redis_call(redis_client.set, key, json.dumps(response), ex=CACHE_TTL)
+
+def cache_stats() -> dict:
+    return {
+        **_stats,
+        "memory_entries": len(memory_cache),
+        "redis_enabled": redis_client is not None,
+        "redis_circuit": redis_breaker.state,
+    }
+
+async def close_cache():
+    if redis_client is not None:
+        await redis_client.aclose()
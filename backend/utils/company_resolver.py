@@ -0,0 +1,237 @@
+# Company-name resolver: maps query text to the canonical company names stored in the stats and
+# insights collections (exact token-trie matches first, then fuzzy n-gram matches) and to a year
+import asyncio
+import heapq
+import math
+import os
+import re
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from dotenv import load_dotenv
+from database import company_insights_collection
+from utils.company_stats_snapshot import company_stats_snapshot
+
+load_dotenv()
+
+# Minimum edit similarity (0-1) for a fuzzy (misspelled) match
+RESOLVER_FUZZY_THRESHOLD = float(os.getenv("RESOLVER_FUZZY_THRESHOLD", 0.8))
+# Minimum trigram Jaccard similarity for a name to be scored by edit similarity, and the number of
+# best candidates per query span that are
+RESOLVER_TRIGRAM_THRESHOLD = float(os.getenv("RESOLVER_TRIGRAM_THRESHOLD", 0.3))
+RESOLVER_FUZZY_CANDIDATES = int(os.getenv("RESOLVER_FUZZY_CANDIDATES", 3))
+# Longest query span (in tokens) compared against the names
+RESOLVER_MAX_SPAN_TOKENS = int(os.getenv("RESOLVER_MAX_SPAN_TOKENS", 4))
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+
+# Trailing words a company is often named without ("Infosys" for "Infosys Limited")
+SUFFIXES = {
+    "ltd", "limited", "pvt", "private", "inc", "corp", "corporation", "co", "company", "llp", "plc",
+    "technologies", "technology", "tech", "labs", "systems", "solutions", "services", "india", "group",
+}
+# Query words never taken for (part of) a misspelled company name
+STOPWORDS = {
+    "what", "which", "when", "where", "who", "whom", "how", "many", "much", "the", "and", "for", "from",
+    "with", "about", "tell", "give", "show", "list", "does", "did", "are", "was", "were", "this", "that",
+    "there", "their", "have", "has", "had", "any", "all", "year", "years", "last", "next", "offered",
+    "package", "salary", "placement", "placements", "company", "companies", "students", "student",
+    "offers", "offer", "internship", "interview", "rounds", "round", "process", "hiring", "role", "roles",
+    "highest", "average", "lowest", "details", "stats", "visited", "campus", "branch", "please", "into",
+}
+
+def name_tokens(name: str) -> tuple[str, ...]:
+    return tuple(_WORD_RE.findall((name or "").lower()))
+
+def _trigrams(text: str) -> set[str]:
+    padded = f" {text} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+class CompanyResolver:
+    def __init__(self):
+        self.loaded = False
+        self.writes = 0
+        self.version = 0
+        self._lock = asyncio.Lock()
+        # source ("stats" / "insights") -> name tokens -> number of stored rows with that name
+        self.rows = {"stats": Counter(), "insights": Counter()}
+        self.display = {}
+        self._dirty = True
+        # Single-word placement keywords: a span made only of these is not taken for a company name
+        self.keywords = set()
+
+    # Words of the intent keywords (set once by the chatbot service)
+    def set_keywords(self, keywords: list[str]):
+        self.keywords = {token for keyword in keywords for token in name_tokens(keyword)}
+
+    # Per-source write hooks; they only touch the lookup structures when the set of names changes
+    def add(self, source: str, metadatas: list[dict]):
+        self.writes += 1
+        for metadata in metadatas:
+            name = (metadata.get("company_name") or "").strip()
+            key = name_tokens(name)
+            if not key:
+                continue
+            if not self._count(key):
+                self._dirty = True
+            self.rows[source][key] += 1
+            # Stats spellings win: the stats lookups need the stored name
+            if key not in self.display or source == "stats":
+                self.display[key] = name
+
+    def remove(self, source: str, metadatas: list[dict]):
+        self.writes += 1
+        for metadata in metadatas:
+            key = name_tokens(metadata.get("company_name"))
+            if self.rows[source][key] > 0:
+                self.rows[source][key] -= 1
+                if not self.rows[source][key]:
+                    del self.rows[source][key]
+                    self._dirty = True
+
+    def clear(self, source: str):
+        self.writes += 1
+        self.rows[source] = Counter()
+        self._dirty = True
+
+    def _count(self, key: tuple) -> int:
+        return self.rows["stats"][key] + self.rows["insights"][key]
+
+    # Rebuilds the token trie and the trigram index from the current names
+    def _rebuild(self):
+        keys = set(self.rows["stats"]) | set(self.rows["insights"])
+        self.display = {key: name for key, name in self.display.items() if key in keys}
+        self.trie = {}
+        aliases = defaultdict(list)
+        for key in keys:
+            aliases[key].append(key)
+            short = key
+            while len(short) > 1 and short[-1] in SUFFIXES:
+                short = short[:-1]
+            if short != key:
+                aliases[short].append(key)
+        # An alias shared by several companies goes to the full name first, then the most rows
+        self.targets = {
+            alias: alias if alias in targets else max(targets, key=self._count)
+            for alias, targets in aliases.items()
+        }
+        self.alias_grams = {}
+        grams = defaultdict(list)
+        for alias, target in self.targets.items():
+            node = self.trie
+            for token in alias:
+                node = node.setdefault(token, {})
+            node[""] = target
+            self.alias_grams[alias] = _trigrams(" ".join(alias))
+            for gram in self.alias_grams[alias]:
+                grams[gram].append(alias)
+        # Postings ordered by the number of trigrams of the name, so a size range is a slice
+        self.grams = {}
+        for gram, aliases in grams.items():
+            aliases.sort(key=lambda alias: len(self.alias_grams[alias]))
+            self.grams[gram] = (aliases, [len(self.alias_grams[alias]) for alias in aliases])
+        self.max_tokens = max((len(key) for key in keys), default=0)
+        self.max_length = max((len(" ".join(key)) for key in keys), default=0)
+        self._dirty = False
+        self.version += 1
+
+    # Longest exact run of query tokens that is a known name or alias; the last one wins on ties
+    def _exact(self, tokens: list[str]):
+        best, best_length = None, 0
+        for start in range(len(tokens)):
+            node = self.trie
+            for end in range(start, len(tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                if "" in node and end - start + 1 >= best_length:
+                    best, best_length = node[""], end - start + 1
+        return best
+
+    # Closest name or alias to any span of up to RESOLVER_MAX_SPAN_TOKENS non-stopword query tokens
+    # (spans made only of placement keywords are skipped). Only names that can reach
+    # RESOLVER_TRIGRAM_THRESHOLD trigram Jaccard similarity are looked at: any such name shares one of
+    # the span's rarest trigrams (prefix filtering), so only those postings are read. The
+    # RESOLVER_FUZZY_CANDIDATES most similar are then scored by edit similarity.
+    def _fuzzy(self, tokens: list[str]):
+        best, best_score = None, RESOLVER_FUZZY_THRESHOLD
+        max_tokens = min(self.max_tokens, RESOLVER_MAX_SPAN_TOKENS)
+        for start in range(len(tokens)):
+            for end in range(start + 1, min(len(tokens), start + max_tokens) + 1):
+                span = tokens[start:end]
+                if span[-1] in STOPWORDS or len(span[-1]) < 3 or span[-1].isdigit():
+                    break
+                text = " ".join(span)
+                # Edit similarity is at most 2 * shorter / (both lengths), so longer spans cannot match
+                if len(text) * RESOLVER_FUZZY_THRESHOLD > self.max_length * (2 - RESOLVER_FUZZY_THRESHOLD):
+                    break
+                if all(token in self.keywords for token in span):
+                    continue
+                for alias in self._candidates(text):
+                    score = SequenceMatcher(None, text, " ".join(alias)).ratio()
+                    if score >= best_score:
+                        best, best_score = self.targets[alias], score
+        return best
+
+    def _candidates(self, text: str) -> list[tuple]:
+        grams = _trigrams(text)
+        if not grams:
+            return []
+        # A name with Jaccard >= t has between t * n and n / t trigrams and shares at least
+        # ceil(t * n) of the span's n trigrams
+        smallest = math.ceil(RESOLVER_TRIGRAM_THRESHOLD * len(grams))
+        largest = math.floor(len(grams) / RESOLVER_TRIGRAM_THRESHOLD)
+        postings = []
+        for gram in grams:
+            aliases, sizes = self.grams.get(gram, ((), ()))
+            postings.append(aliases[bisect_left(sizes, smallest):bisect_right(sizes, largest)])
+        postings.sort(key=len)
+        aliases = set().union(*postings[:len(grams) - smallest + 1])
+        scored = []
+        for alias in aliases:
+            alias_grams = self.alias_grams[alias]
+            overlap = len(grams & alias_grams)
+            jaccard = overlap / (len(grams) + len(alias_grams) - overlap)
+            if jaccard >= RESOLVER_TRIGRAM_THRESHOLD:
+                scored.append((jaccard, alias))
+        return [alias for _, alias in heapq.nlargest(RESOLVER_FUZZY_CANDIDATES, scored)]
+
+    # Applies pending name changes; the returned version changes whenever the names do
+    def refresh(self) -> int:
+        if self._dirty:
+            self._rebuild()
+        return self.version
+
+    # (canonical company name or None, year or None) for the query
+    def resolve(self, query: str) -> tuple[str | None, str | None]:
+        self.refresh()
+        years = _YEAR_RE.findall(query)
+        tokens = _WORD_RE.findall(query.lower())
+        key = self._exact(tokens) or self._fuzzy(tokens)
+        return (self.display.get(key) if key else None), (years[-1] if years else None)
+
+    # Reads every company name once; later writes patch the counts. If a write lands while the
+    # collections are being read, the read is repeated.
+    async def ensure_loaded(self):
+        if self.loaded:
+            return
+        async with self._lock:
+            while not self.loaded:
+                writes = self.writes
+                await company_stats_snapshot.ensure_loaded()
+                insights = await asyncio.to_thread(company_insights_collection.get, include=["metadatas"])
+                if writes != self.writes:
+                    continue
+                self.rows = {"stats": Counter(), "insights": Counter()}
+                self.display = {}
+                rows = company_stats_snapshot.select()
+                self.add("stats", [{"company_name": name} for name in company_stats_snapshot.names[rows]])
+                self.add("insights", insights.get("metadatas") or [])
+                self._rebuild()
+                self.loaded = True
+
+    def get_stats(self) -> dict:
+        return {"loaded": self.loaded, "companies": len(set(self.rows["stats"]) | set(self.rows["insights"]))}
+
+company_resolver = CompanyResolver()
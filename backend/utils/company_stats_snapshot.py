@@ -0,0 +1,195 @@
+# Columnar in-memory snapshot of company_stats_collection for vectorized aggregate queries
+import asyncio
+from collections import defaultdict
+import numpy as np
+from database import company_stats_collection
+from utils.record_keys import normalize_key
+
+BRANCHES = ["CSE", "CSBS", "CYS", "AIML", "DS", "IOT", "IT", "ECE", "EEE", "EIE", "MECH", "CIVIL", "AUTO"]
+# Missing salary / PPO values are stored as NaN so they drop out of aggregates
+FLOAT_FIELDS = ["salary", "internship_ppo"]
+INT_FIELDS = BRANCHES + ["total_offers", "year"]
+
+class CompanyStatsSnapshot:
+    def __init__(self, capacity: int = 1024):
+        self.loaded = False
+        self.writes = 0
+        self._lock = asyncio.Lock()
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        self.capacity = capacity
+        self.size = 0
+        self.columns = {field: np.full(capacity, np.nan) for field in FLOAT_FIELDS}
+        self.columns.update({field: np.zeros(capacity, dtype=np.int64) for field in INT_FIELDS})
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.names = np.empty(capacity, dtype=object)
+        self.ids = np.empty(capacity, dtype=object)
+        self.row_of = {}
+        self.company_index = defaultdict(list)
+        self.year_index = defaultdict(list)
+
+    def _grow(self, needed: int):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self.capacity:
+            return
+        for field, column in self.columns.items():
+            grown = np.full(capacity, np.nan) if field in FLOAT_FIELDS else np.zeros(capacity, dtype=np.int64)
+            grown[:self.size] = column[:self.size]
+            self.columns[field] = grown
+        for attr, dtype in (("alive", bool), ("names", object), ("ids", object)):
+            grown = np.zeros(capacity, dtype=dtype) if dtype is bool else np.empty(capacity, dtype=dtype)
+            grown[:self.size] = getattr(self, attr)[:self.size]
+            setattr(self, attr, grown)
+        self.capacity = capacity
+
+    # Replaces the snapshot with the given rows
+    def load(self, ids: list, metadatas: list[dict]):
+        self._allocate(max(1024, len(ids)))
+        self._append(ids, metadatas)
+        self.loaded = True
+
+    def _append(self, ids: list, metadatas: list[dict]):
+        for entry_id in ids:
+            if entry_id in self.row_of:
+                self._remove([entry_id])
+        self._grow(self.size + len(ids))
+        start, end = self.size, self.size + len(ids)
+        for field in FLOAT_FIELDS:
+            self.columns[field][start:end] = [
+                np.nan if metadata.get(field) is None else metadata[field] for metadata in metadatas
+            ]
+        for field in INT_FIELDS:
+            self.columns[field][start:end] = [metadata.get(field) or 0 for metadata in metadatas]
+        self.names[start:end] = [metadata.get("company_name") for metadata in metadatas]
+        self.ids[start:end] = ids
+        self.alive[start:end] = True
+        for row, (entry_id, metadata) in enumerate(zip(ids, metadatas), start):
+            self.row_of[entry_id] = row
+            self.company_index[normalize_key(metadata.get("company_name"))].append(row)
+            self.year_index[metadata.get("year")].append(row)
+        self.size = end
+
+    def _remove(self, ids: list):
+        for entry_id in ids:
+            row = self.row_of.pop(entry_id, None)
+            if row is not None:
+                self.alive[row] = False
+        # Compact once more than half of the rows are dead
+        if self.size > 1024 and len(self.row_of) < self.size // 2:
+            live = np.flatnonzero(self.alive[:self.size])
+            ids = list(self.ids[live])
+            metadatas = [self.record(row) for row in live]
+            self.load(ids, metadatas)
+
+    def _value(self, field: str, row: int):
+        value = self.columns[field][row]
+        if field in FLOAT_FIELDS:
+            if np.isnan(value):
+                return None
+            return float(value) if field == "salary" else int(value)
+        return int(value)
+
+    async def ensure_loaded(self):
+        if self.loaded:
+            return
+        async with self._lock:
+            while not self.loaded:
+                writes = self.writes
+                data = await asyncio.to_thread(company_stats_collection.get, include=["metadatas"])
+                if writes != self.writes:
+                    continue
+                self.load(data.get("ids") or [], data.get("metadatas") or [])
+
+    # Write hooks called by the dashboard services
+    def add(self, ids: list, metadatas: list[dict]):
+        self.writes += 1
+        if self.loaded:
+            self._append(ids, metadatas)
+
+    def remove(self, ids: list):
+        self.writes += 1
+        if self.loaded:
+            self._remove(ids)
+
+    def clear(self):
+        self.writes += 1
+        if self.loaded:
+            self.load([], [])
+
+    # Boolean row mask for the live rows matching the filters, using the company and year indexes
+    def _mask(self, year: int | None = None, company_name: str | None = None, from_year: int | None = None, to_year: int | None = None):
+        mask = self.alive[:self.size].copy()
+        if year is not None:
+            selected = np.zeros(self.size, dtype=bool)
+            selected[self.year_index.get(year, [])] = True
+            mask &= selected
+        if company_name:
+            selected = np.zeros(self.size, dtype=bool)
+            selected[self.company_index.get(normalize_key(company_name), [])] = True
+            mask &= selected
+        years = self.columns["year"][:self.size]
+        if from_year is not None:
+            mask &= years >= from_year
+        if to_year is not None:
+            mask &= years <= to_year
+        return mask
+
+    def _row(self, row: int) -> dict:
+        return {
+            "company_name": self.names[row],
+            "year": int(self.columns["year"][row]),
+            "salary": self._value("salary", row),
+            "internship_ppo": self._value("internship_ppo", row),
+            "total_offers": int(self.columns["total_offers"][row]),
+            "id": self.ids[row],
+        }
+
+    # Live row numbers matching the filters
+    def select(self, year: int | None = None, company_name: str | None = None) -> np.ndarray:
+        return np.flatnonzero(self._mask(year=year, company_name=company_name))
+
+    # Stored fields of a row, in the shape of a company stats metadata dict
+    def record(self, row: int) -> dict:
+        return {"company_name": self.names[row], **{field: self._value(field, row) for field in self.columns}}
+
+    # Top-N companies by salary, total_offers or internship_ppo
+    def top_companies(self, n: int = 10, by: str = "salary", year: int | None = None) -> list[dict]:
+        rows = np.flatnonzero(self._mask(year=year))
+        values = self.columns[by][rows].astype(float)
+        keep = ~np.isnan(values)
+        rows, values = rows[keep], values[keep]
+        if len(rows) > n:
+            top = np.argpartition(-values, n - 1)[:n]
+            rows, values = rows[top], values[top]
+        return [self._row(row) for row in rows[np.argsort(-values, kind="stable")]]
+
+    # Branch-wise offer totals per year (and overall) across a range of years
+    def branch_offer_totals(self, from_year: int | None = None, to_year: int | None = None) -> dict:
+        mask = self._mask(from_year=from_year, to_year=to_year)
+        years = self.columns["year"][:self.size][mask]
+        distinct, codes = np.unique(years, return_inverse=True)
+        per_year = {int(year): {} for year in distinct}
+        overall = {}
+        for branch in BRANCHES:
+            sums = np.bincount(codes, weights=self.columns[branch][:self.size][mask], minlength=len(distinct))
+            for year, total in zip(distinct, sums):
+                per_year[int(year)][branch] = int(total)
+            overall[branch] = int(sums.sum())
+        return {"years": per_year, "total": overall}
+
+    # Salary percentiles, overall or for one year
+    def salary_percentiles(self, percentiles: list[float], year: int | None = None) -> dict:
+        salaries = self.columns["salary"][:self.size][self._mask(year=year)]
+        salaries = salaries[~np.isnan(salaries)]
+        if not len(salaries):
+            return {"count": 0, "percentiles": {}}
+        values = np.percentile(salaries, percentiles)
+        return {
+            "count": int(len(salaries)),
+            "percentiles": {f"p{p:g}": round(float(value), 2) for p, value in zip(percentiles, values)},
+        }
+
+company_stats_snapshot = CompanyStatsSnapshot()
@@ -0,0 +1,149 @@
+# Token-budgeted prompt context: ranks insights documents and company stats rows by relevance,
+# drops duplicates and packs the best chunks into a fixed token budget
+import os
+import re
+from dataclasses import dataclass
+import numpy as np
+from dotenv import load_dotenv
+from utils.company_stats_snapshot import BRANCHES
+from utils.record_keys import normalize_key
+
+load_dotenv()
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500))
+# Candidates scored per source before packing; everything past this is never formatted
+CONTEXT_INSIGHTS_CANDIDATES = int(os.getenv("CONTEXT_INSIGHTS_CANDIDATES", 8))
+CONTEXT_STATS_CANDIDATES = int(os.getenv("CONTEXT_STATS_CANDIDATES", 40))
+
+# Rough BPE-style count: every word and every punctuation mark is a token
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# Query words that say which stats column the student cares about
+METRIC_HINTS = {
+    "salary": {"salary", "package", "packages", "ctc", "lpa", "highest", "average", "pay"},
+    "internship_ppo": {"ppo", "ppos", "internship", "internships", "intern", "conversion"},
+    "total_offers": {"offer", "offers", "selected", "placed", "hiring", "recruited", "students"},
+}
+
+def estimate_tokens(text: str) -> int:
+    return len(_TOKEN_RE.findall(text))
+
+@dataclass(slots=True)
+class ContextChunk:
+    source: str     # "insights" or "stats"
+    text: str
+    score: float    # relevance in [0, 1], comparable across sources
+    tokens: int
+
+# Same text as the stats context always had, one block per company stats row
+def format_stats_row(meta: dict) -> str:
+    salary = meta.get("salary")
+    ppo = meta.get("internship_ppo")
+    branches = ", ".join(f"{branch}: {meta.get(branch) or 0}" for branch in BRANCHES)
+    return (
+        f"Company: {meta.get('company_name')}, Year: {meta.get('year')}\n"
+        f"Salary: {'N/A' if salary is None else salary} LPA, Internship PPOs: {'N/A' if ppo is None else ppo}\n"
+        f"Total Offers: {meta.get('total_offers', 0)}\n"
+        f"Branch-wise Offers: {branches}"
+    )
+
+def _query_words(query: str) -> set[str]:
+    return set(_WORD_RE.findall(query.lower()))
+
+# Scores retrieved insights hits (see utils.hybrid_retrieval); documents about the extracted
+# company get a boost
+def score_insights(hits: list[dict], company: str | None = None) -> list[ContextChunk]:
+    company_key = normalize_key(company) if company else None
+    chunks = []
+    for hit in hits:
+        document, metadata = hit["document"], hit["metadata"]
+        if not document:
+            continue
+        score = hit["score"]
+        if company_key and metadata and metadata.get("company_key") == company_key:
+            score = min(1.0, score + 0.25)
+        chunks.append(ContextChunk("insights", document, score, estimate_tokens(document)))
+    return chunks
+
+# Scores the company stats rows matching the extracted entities. Without entities every row is
+# a candidate: rows whose company is named in the query rank first, then the column the query
+# asks about (salary, PPOs or offers) and recency decide.
+def score_stats(snapshot, query: str, company: str | None = None, year: int | None = None,
+                limit: int = CONTEXT_STATS_CANDIDATES) -> list[ContextChunk]:
+    rows = snapshot.select(year=year, company_name=company)
+    if not len(rows):
+        return []
+    words = _query_words(query)
+
+    if company:
+        named = np.ones(len(rows))
+    else:
+        mentioned = np.zeros(snapshot.size)
+        for key, key_rows in snapshot.company_index.items():
+            name_words = {word for word in _WORD_RE.findall(key.lower()) if len(word) > 2}
+            if name_words and name_words <= words:
+                mentioned[key_rows] = 1.0
+        named = mentioned[rows]
+
+    metric = next((field for field, hints in METRIC_HINTS.items() if hints & words), "total_offers")
+    values = np.nan_to_num(snapshot.columns[metric][rows].astype(float), nan=0.0)
+    strength = values / values.max() if values.max() > 0 else values
+
+    years = snapshot.columns["year"][rows].astype(float)
+    span = years.max() - years.min()
+    recency = (years - years.min()) / span if span else np.ones(len(rows))
+
+    scores = (named + 0.6 * strength + 0.4 * recency) / 2
+    if len(rows) > limit:
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        rows, scores = rows[top], scores[top]
+    order = np.argsort(-scores, kind="stable")
+    chunks = []
+    for row, score in zip(rows[order], scores[order]):
+        text = format_stats_row(snapshot.record(row))
+        chunks.append(ContextChunk("stats", text, float(score), estimate_tokens(text)))
+    return chunks
+
+# Packs the highest scoring chunks into the budget. A chunk that does not fit is dropped, but
+# smaller chunks after it can still use the remaining room. Duplicate texts are dropped first.
+def pack_context(chunks: list[ContextChunk], budget: int = CONTEXT_TOKEN_BUDGET):
+    seen = set()
+    included, dropped, duplicates = [], [], 0
+    remaining = budget
+    for chunk in sorted(chunks, key=lambda chunk: chunk.score, reverse=True):
+        key = " ".join(chunk.text.split()).lower()
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        if chunk.tokens <= remaining:
+            included.append(chunk)
+            remaining -= chunk.tokens
+        else:
+            dropped.append(chunk)
+    report = {
+        "budget": budget,
+        "included_tokens": budget - remaining,
+        "dropped_tokens": sum(chunk.tokens for chunk in dropped),
+        "included_chunks": len(included),
+        "dropped_chunks": len(dropped),
+        "duplicates": duplicates,
+    }
+    return included, report
+
+# Totals across requests, exposed through /chatbot/stats
+_stats = {"requests": 0, "included_tokens": 0, "dropped_tokens": 0, "duplicates": 0}
+
+# Builds the insights and stats context strings for a prompt, each in relevance order
+def assemble_context(insights: list[ContextChunk], stats: list[ContextChunk], budget: int = CONTEXT_TOKEN_BUDGET):
+    included, report = pack_context(insights + stats, budget)
+    chroma_context = "\n\n".join(chunk.text for chunk in included if chunk.source == "insights")
+    stats_context = "\n\n".join(chunk.text for chunk in included if chunk.source == "stats")
+    _stats["requests"] += 1
+    for key in ("included_tokens", "dropped_tokens", "duplicates"):
+        _stats[key] += report[key]
+    return chroma_context, stats_context, report
+
+def context_stats() -> dict:
+    return {**_stats, "budget": CONTEXT_TOKEN_BUDGET}
@@ -0,0 +1,204 @@
+# Micro-batching embedding executor: encode requests from concurrent handlers are queued, merged into
+# batches on dedicated worker threads and resolved through futures, so the event loop never runs
+# the model and concurrent queries share one forward pass. Bulk requests (ingest) are encoded one
+# chunk at a time with queued queries served in between, so they never hold queries back for a
+# whole encode.
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+import numpy as np
+from dotenv import load_dotenv
+from utils.embedding_model import get_embedding_model
+
+load_dotenv()
+
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", 1))
+# A batch closes when it holds this many texts or when its oldest request has waited this long.
+# The window only applies when other requests are already queued; a lone request runs at once.
+# Requests of more texts are bulk requests, encoded in chunks of this size.
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", 32))
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", 5))
+
+@dataclass(slots=True)
+class _Request:
+    texts: list[str]
+    batch_size: int | None
+    future: Future = field(default_factory=Future)
+    enqueued: float = field(default_factory=time.perf_counter)
+    # Progress of a bulk request: texts encoded so far and their vectors
+    done: int = 0
+    parts: list = field(default_factory=list)
+
+# Queued by shutdown() once per worker
+_STOP = object()
+
+class EmbeddingExecutor:
+    def __init__(self, workers: int = EMBEDDING_WORKERS, max_batch: int = EMBEDDING_MAX_BATCH,
+                 window_ms: float = EMBEDDING_BATCH_WINDOW_MS):
+        self.workers = workers
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self._queue = queue.Queue()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "requests": 0, "completed": 0, "batches": 0, "texts": 0, "max_batch_size": 0,
+            "wait_ms_total": 0.0, "max_wait_ms": 0.0, "encode_ms_total": 0.0, "errors": 0,
+        }
+
+    def _start(self):
+        with self._start_lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"embedding-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    # Queues texts for encoding; the future resolves to a (len(texts), dimension) array.
+    # Requests of more than max_batch texts are encoded on their own, max_batch texts at a time.
+    def submit(self, texts: list[str], batch_size: int | None = None) -> Future:
+        if not self._threads:
+            self._start()
+        request = _Request(list(texts), batch_size)
+        with self._stats_lock:
+            self.stats["requests"] += 1
+        self._queue.put(request)
+        return request.future
+
+    async def encode(self, texts: list[str], batch_size: int | None = None) -> np.ndarray:
+        return await asyncio.wrap_future(self.submit(texts, batch_size))
+
+    # Serves queued requests first: they are merged into batches until a batch is full or, when
+    # others were already waiting, the window of its oldest request has passed (a request that
+    # would overflow the batch is carried over). Bulk requests are set aside and advanced one
+    # chunk after each batch, or whenever no other request is queued; a query waits for at most
+    # one chunk of a bulk encode.
+    def _run(self):
+        carry, bulks = None, deque()
+        while True:
+            if carry is not None:
+                first, carry = carry, None
+            elif bulks:
+                try:
+                    first = self._queue.get_nowait()
+                except queue.Empty:
+                    self._encode_chunk(bulks)
+                    continue
+            else:
+                first = self._queue.get()
+            if first is _STOP:
+                while bulks:
+                    self._encode_chunk(bulks)
+                return
+            if len(first.texts) > self.max_batch:
+                bulks.append(first)
+                continue
+            batch, size = [first], len(first.texts)
+            deadline = first.enqueued + self.window if not self._queue.empty() else 0
+            while size < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                try:
+                    request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is _STOP or len(request.texts) > self.max_batch or size + len(request.texts) > self.max_batch:
+                    carry = request
+                    break
+                batch.append(request)
+                size += len(request.texts)
+            self._encode(batch)
+            # Alternate with the bulk work so a steady stream of queries cannot starve it
+            if bulks:
+                self._encode_chunk(bulks)
+
+    def _vectors(self, texts: list[str], batch_size: int) -> np.ndarray:
+        return np.asarray(get_embedding_model().encode(texts, batch_size=batch_size)) if texts else np.zeros((0, 0))
+
+    def _record(self, started: float, texts: int, waits: list[float], completed: int):
+        with self._stats_lock:
+            self.stats["batches"] += 1
+            self.stats["completed"] += completed
+            self.stats["texts"] += texts
+            self.stats["max_batch_size"] = max(self.stats["max_batch_size"], texts)
+            if waits:
+                self.stats["wait_ms_total"] += sum(waits)
+                self.stats["max_wait_ms"] = max(self.stats["max_wait_ms"], *waits)
+            self.stats["encode_ms_total"] += (time.perf_counter() - started) * 1000
+
+    def _encode(self, batch: list[_Request]):
+        started = time.perf_counter()
+        # Callers that gave up (cancelled futures) are dropped before any work is done
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        texts = [text for request in batch for text in request.texts]
+        try:
+            batch_size = batch[0].batch_size if len(batch) == 1 and batch[0].batch_size else max(len(texts), 1)
+            vectors = self._vectors(texts, batch_size)
+        except Exception as e:
+            with self._stats_lock:
+                self.stats["errors"] += 1
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        self._record(started, len(texts), [(started - request.enqueued) * 1000 for request in batch], len(batch))
+        offset = 0
+        for request in batch:
+            request.future.set_result(vectors[offset:offset + len(request.texts)])
+            offset += len(request.texts)
+
+    # Encodes the next max_batch texts of the oldest bulk request, resolving it after its last chunk
+    def _encode_chunk(self, bulks: deque):
+        request = bulks[0]
+        started = time.perf_counter()
+        first_chunk = request.done == 0
+        if first_chunk and not request.future.set_running_or_notify_cancel():
+            bulks.popleft()
+            return
+        texts = request.texts[request.done:request.done + self.max_batch]
+        try:
+            request.parts.append(self._vectors(texts, min(request.batch_size or len(texts), len(texts))))
+        except Exception as e:
+            bulks.popleft()
+            with self._stats_lock:
+                self.stats["errors"] += 1
+            request.future.set_exception(e)
+            return
+        request.done += len(texts)
+        finished = request.done >= len(request.texts)
+        self._record(started, len(texts), [(started - request.enqueued) * 1000] if first_chunk else [], int(finished))
+        if finished:
+            bulks.popleft()
+            request.future.set_result(np.concatenate(request.parts))
+
+    # Stops the workers after the requests already queued
+    def shutdown(self):
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        self._threads = []
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        batches = stats["batches"] or 1
+        return {
+            "queue_depth": self._queue.qsize(),
+            "workers": len(self._threads),
+            "requests": stats["requests"],
+            "batches": stats["batches"],
+            "errors": stats["errors"],
+            "avg_batch_size": round(stats["texts"] / batches, 2),
+            "max_batch_size": stats["max_batch_size"],
+            "avg_wait_ms": round(stats["wait_ms_total"] / max(stats["completed"], 1), 3),
+            "max_wait_ms": round(stats["max_wait_ms"], 3),
+            "avg_encode_ms": round(stats["encode_ms_total"] / batches, 3),
+        }
+
+embedding_executor = EmbeddingExecutor()
@@ -1,9 +1,150 @@
-from sentence_transformers import SentenceTransformer
+# Embedding backends behind one interface, selected with EMBEDDING_BACKEND:
+#   "sentence-transformers" (default)  full-precision SentenceTransformer
+#   "int8"                             same model with int8 dynamically quantized Linear layers (CPU)
+#   "onnx"                             ONNX Runtime export of the model (needs optimum[onnxruntime])
+#   "hashing"                          deterministic feature hashing, no model; for tests and local runs
+# Every backend's encode() follows SentenceTransformer.encode: a str gives one vector, a list gives a matrix.
+import os
+import re
+import threading
+import zlib
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+HASHING_DIMENSION = int(os.getenv("HASHING_EMBEDDING_DIMENSION", 384))
+
+# Vector space of the embeddings written before backends were configurable
+LEGACY_SPACE = "all-MiniLM-L6-v2"
+# Collection metadata keys: the vector space the stored embeddings live in, and the backend that
+# wrote them. Quantized and ONNX variants of a model share its space, so they can be swapped.
+SPACE_KEY = "embedding_space"
+IDENTITY_KEY = "embedding_backend"
+
+class SentenceTransformerBackend:
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME):
+        from sentence_transformers import SentenceTransformer
+        self.model_name = model_name
+        self.model = self._load(SentenceTransformer)
+
+    def _load(self, SentenceTransformer):
+        return SentenceTransformer(self.model_name)
+
+    @property
+    def identity(self) -> str:
+        return f"{self.name}:{self.model_name}"
+
+    @property
+    def space(self) -> str:
+        return self.model_name
+
+    def encode(self, texts, batch_size: int = 32):
+        return self.model.encode(texts, batch_size=batch_size)
+
+class Int8Backend(SentenceTransformerBackend):
+    name = "int8"
+
+    def _load(self, SentenceTransformer):
+        import torch
+        model = SentenceTransformer(self.model_name, device="cpu")
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+class OnnxBackend(SentenceTransformerBackend):
+    name = "onnx"
+
+    def _load(self, SentenceTransformer):
+        return SentenceTransformer(self.model_name, device="cpu", backend="onnx")
+
+_TOKEN_RE = re.compile(r"\w+")
+
+class HashingBackend:
+    name = "hashing"
+
+    def __init__(self, dimension: int = HASHING_DIMENSION):
+        self.dimension = dimension
+
+    @property
+    def identity(self) -> str:
+        return f"{self.name}:{self.dimension}"
+
+    @property
+    def space(self) -> str:
+        return self.identity
+
+    # Signed feature hashing of words and character trigrams, L2-normalized. Texts sharing words
+    # end up close, so retrieval code paths behave sensibly without a model.
+    def _vector(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        words = _TOKEN_RE.findall(text.lower())
+        features = words + [word[index:index + 3] for word in words for index in range(max(1, len(word) - 2))]
+        for feature in features:
+            digest = zlib.crc32(feature.encode())
+            vector[digest % self.dimension] += 1.0 if digest >> 31 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts, batch_size: int = 32):
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.stack([self._vector(text) for text in texts]) if texts else np.zeros((0, self.dimension), dtype=np.float32)
+
+BACKENDS = {
+    "sentence-transformers": SentenceTransformerBackend,
+    "int8": Int8Backend,
+    "onnx": OnnxBackend,
+    "hashing": HashingBackend,
+}
+
+def create_embedding_backend(name: str):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {name!r}; expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
 
 _model = None
+# Embedding workers (EMBEDDING_WORKERS > 1) can ask for the model at the same time on first use;
+# only one of them loads it
+_model_lock = threading.Lock()
 
 def get_embedding_model():
     global _model
     if _model is None:
-        _model = SentenceTransformer("all-MiniLM-L6-v2")
+        with _model_lock:
+            if _model is None:
+                _model = create_embedding_backend(EMBEDDING_BACKEND)
     return _model
+
+_checked = {}
+
+# Compares the vector space recorded on the collection with the active backend's. An unstamped
+# collection is stamped (as the legacy model if it already holds vectors). Returns an error
+# message on mismatch; the result is kept per collection, since only this process stamps them.
+def check_collection_backend(collection) -> str | None:
+    if collection.name in _checked:
+        return _checked[collection.name]
+    backend = get_embedding_model()
+    metadata = collection.metadata or {}
+    stored = metadata.get(SPACE_KEY)
+    if stored is None:
+        legacy = collection.count() > 0
+        stored = LEGACY_SPACE if legacy else backend.space
+        identity = f"sentence-transformers:{LEGACY_SPACE}" if legacy else backend.identity
+        collection.modify(metadata={**metadata, SPACE_KEY: stored, IDENTITY_KEY: identity})
+    error = None
+    if stored != backend.space:
+        error = (
+            f"Collection {collection.name} holds {stored} vectors but the {backend.identity} backend "
+            f"produces {backend.space} vectors; run scripts/reembed_company_insights.py or switch EMBEDDING_BACKEND back"
+        )
+    _checked[collection.name] = error
+    return error
+
+# Records that the collection's vectors now come from the active backend (after a re-embed)
+def stamp_collection_backend(collection):
+    backend = get_embedding_model()
+    collection.modify(metadata={**(collection.metadata or {}), SPACE_KEY: backend.space, IDENTITY_KEY: backend.identity})
+    _checked[collection.name] = None
@@ -0,0 +1,61 @@
+# Hybrid retrieval over company insights: dense Chroma results fused with BM25 hits
+# by reciprocal rank fusion, so exact company names, role titles and terms like "PPO" count
+import asyncio
+import os
+from dotenv import load_dotenv
+from database import company_insights_collection
+from utils.bm25_index import insights_index
+
+load_dotenv()
+
+RRF_K = int(os.getenv("RRF_K", 60))
+# Candidates taken from each retriever before fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", 20))
+
+# Fuses ranked id lists: every list contributes 1 / (k + rank) for each id it contains
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = RRF_K) -> list[tuple[str, float]]:
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+# Returns up to n_results hits as {"id", "document", "metadata", "score"}; score is the fused
+# score scaled to [0, 1] (1 means ranked first by every retriever). use_vectors=False skips the
+# dense search, for when the stored vectors come from a different embedding backend.
+async def hybrid_search(query: str, query_embedding: list[float], n_results: int,
+                        collection=company_insights_collection, index=insights_index,
+                        candidates: int = HYBRID_CANDIDATES, use_vectors: bool = True) -> list[dict]:
+    records, rankings = {}, []
+    if use_vectors:
+        dense = await asyncio.to_thread(
+            collection.query,
+            query_embeddings=[query_embedding],
+            n_results=max(candidates, n_results),
+            include=["documents", "metadatas"],
+        )
+        records = {
+            doc_id: (document, metadata)
+            for doc_id, document, metadata in zip(dense["ids"][0], dense["documents"][0], dense["metadatas"][0])
+        }
+        rankings.append(dense["ids"][0])
+    try:
+        await index.ensure_loaded()
+        rankings.append([doc_id for doc_id, _ in index.search(query, max(candidates, n_results))])
+    except Exception as e:
+        print(f"[WARN] BM25 search failed, using vector results only: {e}")
+    if not rankings:
+        return []
+
+    fused = reciprocal_rank_fusion(rankings)[:n_results]
+    missing = [doc_id for doc_id, _ in fused if doc_id not in records]
+    if missing:
+        stored = await asyncio.to_thread(collection.get, ids=missing, include=["documents", "metadatas"])
+        records.update(zip(stored["ids"], zip(stored["documents"], stored["metadatas"])))
+
+    best = len(rankings) / (RRF_K + 1)
+    return [
+        {"id": doc_id, "document": records[doc_id][0], "metadata": records[doc_id][1], "score": score / best}
+        for doc_id, score in fused
+        if doc_id in records
+    ]
@@ -0,0 +1,68 @@
+# Precompiled intent classifier for chatbot queries
+import re
+from dataclasses import dataclass, field
+
+@dataclass(slots=True)
+class IntentMatch:
+    intent: str                          # "greeting", "placement" or "unknown"
+    greeting: str | None = None          # first greeting phrase found in the query
+    keywords: list[str] = field(default_factory=list)  # placement keywords found in the query
+
+# Lowercases and normalizes curly apostrophes so "What’s up" matches "what's up"
+def normalize_query(query: str) -> str:
+    return query.strip().lower().replace("’", "'")
+
+# Builds a regex from a character trie of the phrases. Alternatives sharing a prefix are
+# merged, so the engine dispatches on one character at a time instead of retrying every phrase.
+def _trie_pattern(phrases: list[str]) -> str:
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A phrase may end here; the greedy "?" still prefers the longer phrase
+        if "" in node:
+            pattern = "(?:" + pattern + ")?"
+        return pattern
+
+    return build(trie)
+
+# Plural endings accepted after a keyword ("offers", "packages", "placements")
+KEYWORD_INFLECTION = r"(?:es|s)?"
+
+class IntentClassifier:
+    # Compiles every greeting and keyword into a single word-boundary regex. Keywords may carry a
+    # plural ending; greetings must match whole. Keywords are tried first at each position, so
+    # "hiring" is a keyword rather than "hi" followed by letters.
+    def __init__(self, greetings: list[str], keywords: list[str]):
+        self.greetings = set(greetings)
+        self.keywords = set(keywords)
+        self.pattern = re.compile(
+            r"\b(?:(?P<keyword>" + _trie_pattern(list(self.keywords)) + ")" + KEYWORD_INFLECTION
+            + r"|(?P<greeting>" + _trie_pattern(list(self.greetings)) + r"))\b"
+        )
+
+    # Classifies a query in one linear scan of the text
+    def classify(self, query: str) -> IntentMatch:
+        greeting = None
+        keywords = []
+        for match in self.pattern.finditer(normalize_query(query)):
+            keyword = match.group("keyword")
+            if keyword is not None:
+                if keyword not in keywords:
+                    keywords.append(keyword)
+            elif greeting is None:
+                greeting = match.group("greeting")
+        # A query carrying placement keywords is a real question even if it opens with "hi"
+        if keywords:
+            return IntentMatch("placement", greeting, keywords)
+        if greeting:
+            return IntentMatch("greeting", greeting, keywords)
+        return IntentMatch("unknown", None, keywords)
@@ -0,0 +1,86 @@
+# Pagination, sorting and field projection shared by the list endpoints
+import asyncio
+from fastapi import Query
+
+# Builds a Chroma where clause from equality filters
+def build_where(filters: dict):
+    if not filters:
+        return None
+    if len(filters) == 1:
+        key, value = next(iter(filters.items()))
+        return {key: {"$eq": value}}
+    return {"$and": [{key: {"$eq": value}} for key, value in filters.items()]}
+
+# "company_name,year" -> ["company_name", "year"]
+def parse_fields(fields: str | None) -> list[str] | None:
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+# Validates equality filters ([{"year": 2024, "branch": "CSE"}, ...]) against the allowed fields
+# ({field: type}) and coerces their values; raises ValueError on an empty filter or a bad field/value
+def parse_filters(filters: list[dict], fields: dict) -> list[dict]:
+    parsed = []
+    for where in filters:
+        if not where:
+            raise ValueError("Empty filter provided!")
+        unknown = [key for key in where if key not in fields]
+        if unknown:
+            raise ValueError(f"Unsupported filter field(s): {', '.join(unknown)}. Allowed: {', '.join(fields)}.")
+        try:
+            parsed.append({key: fields[key](value) for key, value in where.items()})
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid filter value in {where}.")
+    return parsed
+
+# Common list-endpoint query parameters: limit/offset paging, sorting ("-field" for descending)
+# and a comma separated field projection
+def page_params(
+    limit: int = Query(None, gt=0, le=1000),
+    offset: int = Query(0, ge=0),
+    sort: str = Query(None),
+    fields: str = Query(None)
+):
+    return {"limit": limit, "offset": offset, "sort": sort, "fields": parse_fields(fields)}
+
+def project(record: dict, fields: list[str] | None, keep: tuple = ("id",)) -> dict:
+    if not fields:
+        return record
+    return {key: value for key, value in record.items() if key in fields or key in keep}
+
+# Sorts on one field ("salary" ascending, "-salary" descending); records missing the field go last
+def sort_records(records: list[dict], sort: str | None) -> list[dict]:
+    if not sort:
+        return records
+    descending = sort.startswith("-")
+    field = sort.lstrip("-+")
+    present = [record for record in records if record.get(field) is not None]
+    missing = [record for record in records if record.get(field) is None]
+    present.sort(key=lambda record: record[field], reverse=descending)
+    return present + missing
+
+# Counts the records matching where without loading any metadata
+def count_records(collection, where) -> int:
+    if not where:
+        return collection.count()
+    return len(collection.get(where=where, include=[])["ids"])
+
+# Fetches one page of {**metadata, "id"} records plus the total number of matches.
+# Without sorting, limit/offset are pushed down into the Chroma get; sorting needs every match.
+async def fetch_page(collection, where=None, limit: int | None = None, offset: int = 0, sort: str | None = None):
+    def run():
+        if sort:
+            data = collection.get(where=where, include=["metadatas"])
+            records = [{**metadata, "id": entry_id} for metadata, entry_id in zip(data["metadatas"], data["ids"])]
+            records = sort_records(records, sort)
+            end = offset + limit if limit is not None else None
+            return records[offset:end], len(records)
+        if limit is None and not offset:
+            data = collection.get(where=where, include=["metadatas"])
+            total = len(data["ids"])
+        else:
+            data = collection.get(where=where, limit=limit, offset=offset or None, include=["metadatas"])
+            total = count_records(collection, where)
+        records = [{**metadata, "id": entry_id} for metadata, entry_id in zip(data["metadatas"], data["ids"])]
+        return records, total
+    return await asyncio.to_thread(run)
@@ -1,5 +1,9 @@
-import requests
+# Async Ollama client sharing one connection pool across requests
+import asyncio
+import httpx
+import json
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,22 +11,182 @@ load_dotenv()
 CHATBOT_MODEL=os.getenv("CHATBOT_MODEL")
 CHATBOT_URL=os.getenv("CHATBOT_ENDPOINT")
 
-def query_ollama(prompt: str, model: str = CHATBOT_MODEL):
-    try:
-        response = requests.post(
-            CHATBOT_URL,
-            json={"model": model, "prompt": prompt, "stream": False}
+# Pool and limit settings (seconds / counts)
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", 5))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", 120))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 10))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", 60))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", 0.5))
+
+# Errors worth retrying: the request never reached the model or the server was briefly unavailable
+TRANSIENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, httpx.RemoteProtocolError)
+TRANSIENT_STATUS_CODES = {502, 503, 504}
+
+BUSY_MESSAGE = "Sorry, the assistant is busy right now. Please try again in a moment."
+ERROR_MESSAGE = "Sorry, I couldn’t generate a response right now."
+CONNECTION_MESSAGE = "Sorry, something went wrong while connecting to the LLM."
+
+_client: httpx.AsyncClient | None = None
+_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+_stats = {
+    "requests": 0,
+    "in_flight": 0,
+    "queued": 0,
+    "retries": 0,
+    "timeouts": 0,
+    "failures": 0,
+    "rejected": 0,
+    "total_queue_wait_ms": 0.0,
+}
+
+class _TransientStatus(Exception):
+    pass
+
+def get_llm_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS),
         )
-        if response.status_code == 200:
-            data = response.json()
-            if "response" in data:
-                return data["response"]
-            else:
-                print("Unexpected response format:", data)
-                return "Sorry, I couldn’t understand the response from the model."
-        else:
-            print("Ollama API error:", response.status_code, response.text)
-            return "Sorry, I couldn’t generate a response right now."
-    except Exception as e:
-        print("Ollama request failed:", str(e))
-        return "Sorry, something went wrong while connecting to the LLM."
+    return _client
+
+async def close_llm_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+# Pool and queue statistics for sizing against the Ollama host
+def llm_stats() -> dict:
+    completed = max(_stats["requests"] - _stats["queued"], 1)
+    return {
+        **_stats,
+        "avg_queue_wait_ms": round(_stats["total_queue_wait_ms"] / completed, 2),
+        "max_concurrency": LLM_MAX_CONCURRENCY,
+        "max_connections": LLM_MAX_CONNECTIONS,
+        "connect_timeout": LLM_CONNECT_TIMEOUT,
+        "read_timeout": LLM_READ_TIMEOUT,
+    }
+
+# Waits for a generation slot; returns False if none frees up within LLM_QUEUE_TIMEOUT
+async def _acquire_slot() -> bool:
+    _stats["requests"] += 1
+    _stats["queued"] += 1
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(_semaphore.acquire(), LLM_QUEUE_TIMEOUT)
+        return True
+    except asyncio.TimeoutError:
+        _stats["rejected"] += 1
+        return False
+    finally:
+        _stats["queued"] -= 1
+        _stats["total_queue_wait_ms"] += (time.perf_counter() - started) * 1000
+
+async def _backoff(attempt: int):
+    _stats["retries"] += 1
+    await asyncio.sleep(LLM_RETRY_BACKOFF * (2 ** attempt))
+
+async def query_ollama(prompt: str, model: str = CHATBOT_MODEL):
+    if not await _acquire_slot():
+        return BUSY_MESSAGE
+    _stats["in_flight"] += 1
+    try:
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                response = await get_llm_client().post(
+                    CHATBOT_URL,
+                    json={"model": model, "prompt": prompt, "stream": False}
+                )
+                if response.status_code in TRANSIENT_STATUS_CODES:
+                    raise _TransientStatus(f"{response.status_code} {response.text}")
+                if response.status_code == 200:
+                    data = response.json()
+                    if "response" in data:
+                        return data["response"]
+                    else:
+                        print("Unexpected response format:", data)
+                        return "Sorry, I couldn’t understand the response from the model."
+                else:
+                    print("Ollama API error:", response.status_code, response.text)
+                    _stats["failures"] += 1
+                    return ERROR_MESSAGE
+            except (*TRANSIENT_ERRORS, _TransientStatus) as e:
+                if attempt < LLM_MAX_RETRIES:
+                    await _backoff(attempt)
+                    continue
+                print("Ollama request failed after retries:", str(e))
+                _stats["failures"] += 1
+                return CONNECTION_MESSAGE
+            except httpx.TimeoutException as e:
+                # Read timeouts are not retried: the model was already generating
+                print("Ollama request timed out:", str(e))
+                _stats["timeouts"] += 1
+                return ERROR_MESSAGE
+            except Exception as e:
+                print("Ollama request failed:", str(e))
+                _stats["failures"] += 1
+                return CONNECTION_MESSAGE
+    finally:
+        _stats["in_flight"] -= 1
+        _semaphore.release()
+
+# Streams the generation token by token. Ollama sends one JSON object per line
+# ({"response": "<token>", "done": false}) until a final object with "done": true.
+# Transient errors are retried only until the first token has been sent.
+async def stream_ollama(prompt: str, model: str = CHATBOT_MODEL):
+    if not await _acquire_slot():
+        yield BUSY_MESSAGE
+        return
+    _stats["in_flight"] += 1
+    try:
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            started = False
+            try:
+                async with get_llm_client().stream(
+                    "POST",
+                    CHATBOT_URL,
+                    json={"model": model, "prompt": prompt, "stream": True}
+                ) as response:
+                    if response.status_code in TRANSIENT_STATUS_CODES:
+                        raise _TransientStatus(str(response.status_code))
+                    if response.status_code != 200:
+                        body = await response.aread()
+                        print("Ollama API error:", response.status_code, body.decode(errors="replace"))
+                        _stats["failures"] += 1
+                        yield ERROR_MESSAGE
+                        return
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        data = json.loads(line)
+                        if data.get("response"):
+                            started = True
+                            yield data["response"]
+                        if data.get("done"):
+                            return
+                    return
+            except (*TRANSIENT_ERRORS, _TransientStatus) as e:
+                if not started and attempt < LLM_MAX_RETRIES:
+                    await _backoff(attempt)
+                    continue
+                print("Ollama stream failed:", str(e))
+                _stats["failures"] += 1
+                yield CONNECTION_MESSAGE
+                return
+            except httpx.TimeoutException as e:
+                print("Ollama stream timed out:", str(e))
+                _stats["timeouts"] += 1
+                yield ERROR_MESSAGE
+                return
+            except Exception as e:
+                print("Ollama stream failed:", str(e))
+                _stats["failures"] += 1
+                yield CONNECTION_MESSAGE
+                return
+    finally:
+        _stats["in_flight"] -= 1
+        _semaphore.release()
@@ -6,8 +6,18 @@ load_dotenv()
 
 SPACY=os.getenv("SPACY_MODEL")
 
-nlp = spacy.load(SPACY)
+# Only NER output is read, so every other pipeline component is left out at load time.
+# tok2vec stays because NER may listen to the shared token-to-vector layer.
+NON_NER_COMPONENTS = ["tagger", "parser", "attribute_ruler", "lemmatizer", "senter", "morphologizer"]
+
+_nlp = None
+
+def get_nlp():
+    global _nlp
+    if _nlp is None:
+        _nlp = spacy.load(SPACY, exclude=NON_NER_COMPONENTS)
+    return _nlp
 
 def extract_entities(text: str):
-    doc = nlp(text)
+    doc = get_nlp()(text)
     return [(ent.text, ent.label_) for ent in doc.ents]
@@ -0,0 +1,153 @@
+# Materialized placement analytics, patched on every stats write so reads never rescan the collections
+import asyncio
+from collections import Counter, defaultdict
+from database import placement_stats_collection, company_stats_collection
+
+PLACEMENT_FIELDS = [
+    "class_total", "registered", "eligible", "selected_male", "selected_female", "selected_total",
+    "single_offers", "multiple_offers", "total_offers",
+]
+
+def _rate(part, whole):
+    return round(part * 100 / whole, 2) if whole else 0.0
+
+class PlacementSummary:
+    def __init__(self):
+        self.loaded = False
+        self.writes = 0
+        self._lock = asyncio.Lock()
+        self._reset_placement()
+        self._reset_company()
+
+    def _reset_placement(self):
+        # (year, branch) -> summed placement fields
+        self.placement = defaultdict(Counter)
+
+    def _reset_company(self):
+        # year -> company totals, plus a multiset of salaries so the highest survives deletes
+        self.company = defaultdict(Counter)
+        self.salaries = defaultdict(Counter)
+
+    # Builds the summary from the collections once; later writes patch it in place.
+    # If a write lands while the collections are being read, the read is repeated.
+    async def ensure_loaded(self):
+        if self.loaded:
+            return
+        async with self._lock:
+            while not self.loaded:
+                writes = self.writes
+                placement, company = await asyncio.to_thread(
+                    lambda: (placement_stats_collection.get(include=["metadatas"]),
+                             company_stats_collection.get(include=["metadatas"]))
+                )
+                if writes != self.writes:
+                    continue
+                self._reset_placement()
+                self._reset_company()
+                for metadata in placement.get("metadatas") or []:
+                    self._apply_placement(metadata, 1)
+                for metadata in company.get("metadatas") or []:
+                    self._apply_company(metadata, 1)
+                self.loaded = True
+
+    def _apply_placement(self, metadata: dict, sign: int):
+        key = (metadata.get("year"), metadata.get("branch"))
+        totals = self.placement[key]
+        totals["records"] += sign
+        for field in PLACEMENT_FIELDS:
+            totals[field] += sign * (metadata.get(field) or 0)
+        if totals["records"] <= 0:
+            del self.placement[key]
+
+    def _apply_company(self, metadata: dict, sign: int):
+        year = metadata.get("year")
+        totals = self.company[year]
+        totals["records"] += sign
+        totals["total_offers"] += sign * (metadata.get("total_offers") or 0)
+        totals["internship_ppo"] += sign * (metadata.get("internship_ppo") or 0)
+        salary = metadata.get("salary")
+        if salary is not None:
+            totals["salary_sum"] += sign * salary
+            totals["salary_count"] += sign
+            self.salaries[year][salary] += sign
+            if self.salaries[year][salary] <= 0:
+                del self.salaries[year][salary]
+        if totals["records"] <= 0:
+            del self.company[year]
+            self.salaries.pop(year, None)
+
+    # Write hooks called by the dashboard services
+    def add_placement(self, metadatas: list[dict]):
+        self.writes += 1
+        if self.loaded:
+            for metadata in metadatas:
+                self._apply_placement(metadata, 1)
+
+    def remove_placement(self, metadatas: list[dict]):
+        self.writes += 1
+        if self.loaded:
+            for metadata in metadatas:
+                self._apply_placement(metadata, -1)
+
+    def clear_placement(self):
+        self.writes += 1
+        self._reset_placement()
+
+    def add_company(self, metadatas: list[dict]):
+        self.writes += 1
+        if self.loaded:
+            for metadata in metadatas:
+                self._apply_company(metadata, 1)
+
+    def remove_company(self, metadatas: list[dict]):
+        self.writes += 1
+        if self.loaded:
+            for metadata in metadatas:
+                self._apply_company(metadata, -1)
+
+    def clear_company(self):
+        self.writes += 1
+        self._reset_company()
+
+    @staticmethod
+    def _placement_view(totals: Counter) -> dict:
+        view = {field: totals[field] for field in PLACEMENT_FIELDS}
+        view["placement_rate"] = _rate(totals["selected_total"], totals["eligible"])
+        view["single_offer_rate"] = _rate(totals["single_offers"], totals["selected_total"])
+        view["multiple_offer_rate"] = _rate(totals["multiple_offers"], totals["selected_total"])
+        return view
+
+    # Per-year and per-branch placement rates plus per-year company offers and salary figures
+    def snapshot(self, year: int | None = None, branch: str | None = None) -> dict:
+        years = defaultdict(Counter)
+        branches = defaultdict(Counter)
+        per_year_branch = defaultdict(dict)
+        for (row_year, row_branch), totals in self.placement.items():
+            if (year is not None and row_year != year) or (branch and row_branch != branch):
+                continue
+            years[row_year].update(totals)
+            branches[row_branch].update(totals)
+            per_year_branch[row_year][row_branch] = self._placement_view(totals)
+
+        companies = {}
+        for row_year, totals in self.company.items():
+            if year is not None and row_year != year:
+                continue
+            companies[row_year] = {
+                "companies": totals["records"],
+                "total_offers": totals["total_offers"],
+                "internship_ppo": totals["internship_ppo"],
+                "average_salary": round(totals["salary_sum"] / totals["salary_count"], 2) if totals["salary_count"] else None,
+                "highest_salary": max(self.salaries[row_year]) if self.salaries[row_year] else None,
+            }
+
+        return {
+            "years": {
+                row_year: {**self._placement_view(totals), "branches": per_year_branch[row_year]}
+                for row_year, totals in sorted(years.items())
+            },
+            "branches": {row_branch: self._placement_view(totals) for row_branch, totals in sorted(branches.items())},
+            "companies": dict(sorted(companies.items())),
+        }
+
+placement_summary = PlacementSummary()
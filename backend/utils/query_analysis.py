@@ -0,0 +1,27 @@
+# Per-request query analysis, computed once and passed through the chatbot pipeline
+import re
+from dataclasses import dataclass
+from utils.intent import IntentMatch
+
+@dataclass(frozen=True, slots=True)
+class QueryAnalysis:
+    query: str
+    intent: IntentMatch
+    entities: tuple[tuple[str, str], ...] = ()
+    company: str | None = None
+    year: str | None = None
+
+# Collapses whitespace for the analysis cache key. Case is kept because NER depends on it.
+def normalize_whitespace(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip()
+
+# Picks the company (last ORG) and year (last all-digit DATE) out of the NER output
+def company_and_year(entities) -> tuple[str | None, str | None]:
+    company = None
+    year = None
+    for text, label in entities:
+        if label == "ORG":
+            company = text
+        elif label == "DATE" and text.isdigit():
+            year = text
+    return company, year
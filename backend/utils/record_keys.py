@@ -0,0 +1,33 @@
+# Deterministic record ids derived from each collection's natural key, so re-posting the same
+# branch+year, company+year or company+role replaces the stored record instead of duplicating it
+import re
+import uuid
+
+# Fixed namespace of the name-based (version 5) uuids; changing it would re-key every record
+RECORD_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_DNS, "smart-placements-assistance")
+
+# Case and spacing are not part of a key ("Tata  Consultancy" == "tata consultancy")
+def normalize_key(value) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip().lower()
+
+def _record_id(kind: str, *parts) -> str:
+    return str(uuid.uuid5(RECORD_NAMESPACE, "|".join([kind, *(normalize_key(part) for part in parts)])))
+
+def placement_stats_id(branch: str, year: int) -> str:
+    return _record_id("placement-stats", branch, year)
+
+def company_stats_id(company_name: str, year: int) -> str:
+    return _record_id("company-stats", company_name, year)
+
+def company_insights_id(company_name: str, role: str) -> str:
+    return _record_id("company-insights", company_name, role)
+
+# Natural-key id of a stored record's metadata, per collection (used by the dedupe command)
+def placement_stats_key(metadata: dict) -> str:
+    return placement_stats_id(metadata.get("branch"), metadata.get("year"))
+
+def company_stats_key(metadata: dict) -> str:
+    return company_stats_id(metadata.get("company_name"), metadata.get("year"))
+
+def company_insights_key(metadata: dict) -> str:
+    return company_insights_id(metadata.get("company_name"), metadata.get("roles"))
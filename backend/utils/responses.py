@@ -0,0 +1,52 @@
+# App-wide response layer: orjson encoding, chunked streaming of large lists and gzip settings
+import os
+import orjson
+from dotenv import load_dotenv
+from fastapi.responses import JSONResponse, StreamingResponse
+
+load_dotenv()
+
+# Lists longer than this are streamed in chunks instead of being encoded into one buffer
+JSON_STREAM_THRESHOLD = int(os.getenv("JSON_STREAM_THRESHOLD", 2000))
+JSON_STREAM_CHUNK_SIZE = int(os.getenv("JSON_STREAM_CHUNK_SIZE", 500))
+# Bodies smaller than this are sent uncompressed; compressing them costs more than it saves
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", 1024))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 5))
+
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, option=_ORJSON_OPTIONS)
+
+# Default response class of the app: same output as JSONResponse, encoded with orjson
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+# Yields a JSON array one chunk of items at a time, so the full body is never held in memory
+def iter_json_list(items: list, chunk_size: int = JSON_STREAM_CHUNK_SIZE):
+    yield b"["
+    for start in range(0, len(items), chunk_size):
+        if start:
+            yield b","
+        # Strip the brackets of the chunk's own array and splice its items into the outer one
+        yield dumps(items[start:start + chunk_size])[1:-1]
+    yield b"]"
+
+# HTTP status of a bulk add or import report: 200 when every record was written, 207 (Multi-Status)
+# when some were skipped, invalid or failed, 422 when nothing was written
+def bulk_write_status(report: dict) -> int:
+    if "error" in report:
+        return 422
+    if report.get("skipped") or report.get("failed") or report.get("invalid"):
+        return 207
+    return 200
+
+# Builds the response for route results that skip FastAPI's jsonable_encoder pass.
+# Content must already be JSON-native (dicts, lists, str, numbers, numpy values).
+def json_response(content, status_code: int = 200, headers: dict | None = None):
+    if isinstance(content, list) and len(content) > JSON_STREAM_THRESHOLD:
+        return StreamingResponse(
+            iter_json_list(content), status_code=status_code, headers=headers, media_type="application/json"
+        )
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
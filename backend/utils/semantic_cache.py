@@ -0,0 +1,84 @@
+# Semantic answer cache: serves a stored answer when a new query's embedding is close enough
+import os
+import time
+import numpy as np
+from dotenv import load_dotenv
+from utils.record_keys import normalize_key
+
+load_dotenv()
+
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", 1024))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.92))
+SEMANTIC_CACHE_NEAR_MISS_MARGIN = float(os.getenv("SEMANTIC_CACHE_NEAR_MISS_MARGIN", 0.05))
+SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", 3600))
+
+class SemanticCache:
+    # Entries live in a fixed-size ring buffer: one row of a normalized embedding matrix per answer,
+    # plus the entity guard (company, year) the answer was generated for.
+    def __init__(self, size: int = SEMANTIC_CACHE_SIZE, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 near_miss_margin: float = SEMANTIC_CACHE_NEAR_MISS_MARGIN, ttl: int = SEMANTIC_CACHE_TTL):
+        self.size = size
+        self.threshold = threshold
+        self.near_miss_margin = near_miss_margin
+        self.ttl = ttl
+        self.vectors = None
+        self.guards = [None] * size
+        self.responses = [None] * size
+        self.expires = np.zeros(size)
+        self.next_slot = 0
+        self.stats = {"hits": 0, "misses": 0, "near_misses": 0}
+
+    # Company and year must match exactly, so answers for different companies never collide
+    @staticmethod
+    def guard(company: str | None, year: str | int | None):
+        return (normalize_key(company) if company else None, str(year) if year else None)
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding, company: str | None = None, year: str | int | None = None):
+        if self.vectors is None:
+            self.stats["misses"] += 1
+            return None
+        guard = self.guard(company, year)
+        candidates = np.flatnonzero(self.expires > time.time())
+        candidates = [slot for slot in candidates if self.guards[slot] == guard]
+        if not candidates:
+            self.stats["misses"] += 1
+            return None
+        similarities = self.vectors[candidates] @ self._normalize(embedding)
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.threshold:
+            self.stats["hits"] += 1
+            return self.responses[candidates[best]]
+        if similarities[best] >= self.threshold - self.near_miss_margin:
+            self.stats["near_misses"] += 1
+        else:
+            self.stats["misses"] += 1
+        return None
+
+    def store(self, embedding, response: dict, company: str | None = None, year: str | int | None = None):
+        vector = self._normalize(embedding)
+        if self.vectors is None:
+            self.vectors = np.zeros((self.size, vector.shape[0]), dtype=np.float32)
+        slot = self.next_slot
+        self.vectors[slot] = vector
+        self.guards[slot] = self.guard(company, year)
+        self.responses[slot] = response
+        self.expires[slot] = time.time() + self.ttl
+        self.next_slot = (slot + 1) % self.size
+
+    def clear(self):
+        self.expires[:] = 0
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "entries": int(np.count_nonzero(self.expires > time.time())),
+            "threshold": self.threshold,
+        }
+
+semantic_cache = SemanticCache()
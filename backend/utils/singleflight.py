@@ -0,0 +1,68 @@
+# Single-flight request coalescing: concurrent calls with the same key share one execution
+import asyncio
+
+class SingleFlight:
+    def __init__(self):
+        self.calls: dict[str, asyncio.Task] = {}
+        self.stats = {"leaders": 0, "coalesced": 0, "waiting": 0}
+
+    # Returns the in-flight task for key, if any
+    def get(self, key: str) -> asyncio.Task | None:
+        return self.calls.get(key)
+
+    # Starts fn() as the in-flight task for key; callers must check get(key) first
+    def start(self, key: str, fn) -> asyncio.Task:
+        self.stats["leaders"] += 1
+        task = asyncio.ensure_future(fn())
+        self.calls[key] = task
+        task.add_done_callback(lambda _: self.calls.pop(key, None))
+        return task
+
+    # The first caller starts fn() as a task; duplicates arriving before it finishes await the same task.
+    # The task is shielded, so a disconnecting caller does not cancel the work for the others.
+    async def do(self, key: str, fn):
+        task = self.calls.get(key)
+        if task is None:
+            return await asyncio.shield(self.start(key, fn))
+        return await self.wait(task)
+
+    async def wait(self, task: asyncio.Task):
+        self.stats["coalesced"] += 1
+        self.stats["waiting"] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self.stats["waiting"] -= 1
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "in_flight": len(self.calls)}
+
+# Tokens of an in-flight generation: every subscriber gets the tokens published so far, then the
+# new ones as they arrive, until the generation closes the stream
+class TokenFanout:
+    def __init__(self):
+        self.tokens = []
+        self.closed = False
+        self._changed = asyncio.Event()
+
+    def publish(self, token: str):
+        self.tokens.append(token)
+        self._wake()
+
+    def close(self):
+        self.closed = True
+        self._wake()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self):
+        index = 0
+        while True:
+            while index < len(self.tokens):
+                yield self.tokens[index]
+                index += 1
+            if self.closed:
+                return
+            await self._changed.wait()
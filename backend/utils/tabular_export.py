@@ -0,0 +1,72 @@
+# Streaming NDJSON/CSV export: pages through a Chroma collection and encodes one page at a time,
+# so memory stays flat however large the collection is
+import csv
+import io
+import os
+from dotenv import load_dotenv
+from fastapi.responses import StreamingResponse
+from utils.responses import dumps
+
+load_dotenv()
+
+# Records fetched from Chroma (and encoded) per page
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", 1000))
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Yields pages of records as {"id", **metadata} dicts, plus "document" / "embedding" when asked for.
+# Pages follow Chroma's offset order; records written while the export runs may or may not be included.
+def iter_record_pages(collection, where: dict | None = None, documents: bool = False,
+                      embeddings: bool = False, page_size: int = EXPORT_PAGE_SIZE):
+    include = ["metadatas"] + (["documents"] if documents else []) + (["embeddings"] if embeddings else [])
+    offset = 0
+    while True:
+        page = collection.get(where=where, limit=page_size, offset=offset, include=include)
+        ids = page["ids"]
+        if not ids:
+            return
+        records = []
+        for index, entry_id in enumerate(ids):
+            record = {"id": entry_id, **(page["metadatas"][index] or {})}
+            if documents:
+                record["document"] = page["documents"][index]
+            if embeddings:
+                record["embedding"] = page["embeddings"][index]
+            records.append(record)
+        yield records
+        if len(ids) < page_size:
+            return
+        offset += len(ids)
+
+# One JSON object per line
+def iter_ndjson(pages):
+    for records in pages:
+        yield b"".join(dumps(record) + b"\n" for record in records)
+
+# Header row of columns, then one row per record; keys outside columns are dropped and
+# list values (embeddings) are written as JSON arrays
+def iter_csv(pages, columns: list[str]):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, restval="", extrasaction="ignore")
+    writer.writeheader()
+    for records in pages:
+        for record in records:
+            writer.writerow({
+                key: dumps(value).decode() if isinstance(value, (list, tuple)) or hasattr(value, "tolist") else value
+                for key, value in record.items()
+            })
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+# Streams the pages in the requested format as a file download. The generators are synchronous,
+# so Starlette runs them (and the Chroma reads) in its thread pool.
+def export_response(pages, file_format: str, columns: list[str], filename: str) -> StreamingResponse:
+    body = iter_csv(pages, columns) if file_format == "csv" else iter_ndjson(pages)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[file_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{file_format}"'},
+    )
@@ -0,0 +1,117 @@
+# Streaming CSV/XLSX import: reads an uploaded sheet row by row, validates every row into a pydantic
+# model and hands the valid ones over in fixed-size batches, so memory stays flat however large the file
+import asyncio
+import csv
+import io
+import os
+from itertools import islice
+from dotenv import load_dotenv
+from pydantic import BaseModel, ValidationError
+
+load_dotenv()
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 500))
+# Row errors listed in the report; later ones are only counted
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", 1000))
+
+FORMATS = ("csv", "xlsx")
+
+# "csv" / "xlsx" from the file name (or content type), None if neither
+def detect_format(filename: str | None, content_type: str | None = None) -> str | None:
+    extension = (filename or "").rsplit(".", 1)[-1].lower()
+    if extension in FORMATS:
+        return extension
+    if content_type in ("text/csv", "application/csv"):
+        return "csv"
+    if content_type == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet":
+        return "xlsx"
+    return None
+
+def _normalize_header(header) -> str:
+    return "_".join(str(header or "").strip().lower().split())
+
+# Maps sheet headers to model fields, ignoring case and spacing ("Company Name" -> company_name)
+def _header_map(headers, model: type[BaseModel]) -> list[str | None]:
+    fields = {_normalize_header(name): name for name in model.model_fields}
+    return [fields.get(_normalize_header(header)) for header in headers]
+
+# Yields (sheet row number, {header: cell}) for every data row
+def _csv_rows(file):
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    reader = csv.reader(text)
+    headers = next(reader, [])
+    for row_number, values in enumerate(reader, start=2):
+        yield row_number, headers, values
+
+def _xlsx_rows(file):
+    from openpyxl import load_workbook
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        headers = next(rows, ())
+        for row_number, values in enumerate(rows, start=2):
+            yield row_number, headers, values
+    finally:
+        workbook.close()
+
+# Yields (row number, validated model or None, errors) for every non-empty row of the sheet.
+# Empty cells are left out so the model defaults apply.
+def iter_models(file, file_format: str, model: type[BaseModel]):
+    rows = _csv_rows(file) if file_format == "csv" else _xlsx_rows(file)
+    fields = None
+    for row_number, headers, values in rows:
+        if fields is None:
+            fields = _header_map(headers, model)
+        record = {}
+        for field, value in zip(fields, values):
+            if field is None or value is None:
+                continue
+            if isinstance(value, str):
+                value = value.strip()
+                if not value:
+                    continue
+            record[field] = value
+        if not record:
+            continue
+        try:
+            yield row_number, model.model_validate(record), None
+        except ValidationError as e:
+            errors = [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()]
+            yield row_number, None, errors
+
+# Streams the sheet through write_batch(models, row_numbers), which returns a report with
+# "inserted", "updated", "skipped" and "failed" (row-level entries carry "row"). Parsing and
+# validation run in a worker thread one batch at a time; only the current batch and the error
+# report are held.
+async def import_sheet(file, file_format: str, model: type[BaseModel], write_batch,
+                       batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    report = {"rows": 0, "inserted": 0, "updated": 0, "invalid": [], "skipped": [], "failed": [], "errors_not_listed": 0}
+
+    def note(kind: str, entry: dict):
+        if len(report["invalid"]) + len(report["skipped"]) + len(report["failed"]) < IMPORT_MAX_ERRORS:
+            report[kind].append(entry)
+        else:
+            report["errors_not_listed"] += 1
+
+    rows = iter_models(file, file_format, model)
+    while True:
+        chunk = await asyncio.to_thread(lambda: list(islice(rows, batch_size)))
+        if not chunk:
+            break
+        models, row_numbers = [], []
+        for row_number, validated, errors in chunk:
+            report["rows"] += 1
+            if validated is None:
+                note("invalid", {"row": row_number, "errors": errors})
+            else:
+                models.append(validated)
+                row_numbers.append(row_number)
+        if not models:
+            continue
+        result = await write_batch(models, row_numbers)
+        report["inserted"] += result["inserted"]
+        report["updated"] += result["updated"]
+        for kind in ("skipped", "failed"):
+            for entry in result[kind]:
+                note(kind, entry)
+    return report
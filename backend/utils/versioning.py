@@ -0,0 +1,55 @@
+# Per-collection version counters, ETags and a version-keyed response cache for GET routes
+# The counters and the cache live in this process only: they are bumped by the API's own write
+# paths, so the ETags assume a single server process. Writes made by another worker or by the
+# scripts/ commands are not seen, and cached bodies and 304s stay stale until the server restarts.
+import hashlib
+import json
+import os
+import uuid
+from collections import Counter
+from fastapi import Request, Response
+from utils.cache import TTLCache
+from utils.responses import json_response
+
+# Changes on every restart, so an ETag from a previous process never matches
+_BOOT_ID = uuid.uuid4().hex[:8]
+_versions = Counter()
+response_cache = TTLCache(maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", 256)))
+
+# Called by every add and delete path of the collection
+def bump_version(collection_name: str):
+    _versions[collection_name] += 1
+
+# Current version of the collection (0 until its first write in this process)
+def get_version(collection_name: str) -> int:
+    return _versions[collection_name]
+
+# Weak ETag of a GET result: collection, process, version and a digest of the query arguments
+def make_etag(collection_name: str, args) -> str:
+    digest = hashlib.sha1(json.dumps(args, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f'W/"{collection_name}-{_BOOT_ID}-{get_version(collection_name)}-{digest}"'
+
+# True if any entity tag in If-None-Match (or "*") matches
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+# Serves a list GET: 304 when the client's ETag is current, otherwise the cached result for this
+# collection version and arguments, otherwise fetch() (which returns (data, total)).
+# The result is returned as a ready response, skipping FastAPI's jsonable_encoder pass.
+async def versioned_get(request: Request, collection_name: str, args, fetch) -> Response:
+    etag = make_etag(collection_name, args)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    # A write during fetch() bumps the version, so a stale result is cached under an old ETag only
+    result = response_cache.get(etag)
+    if result is None:
+        result = await fetch()
+        response_cache.set(etag, result)
+    data, total = result
+    headers["X-Total-Count"] = str(total)
+    return json_response(data, headers=headers)
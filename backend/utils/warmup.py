@@ -0,0 +1,61 @@
+# Startup warm-up: preloads models and stores so the first real request does not pay for it
+import asyncio
+import inspect
+import time
+from database import placement_stats_collection, company_stats_collection, company_insights_collection
+from utils.cache import get_cached_response
+from utils.embedding_model import get_embedding_model, check_collection_backend
+from utils.nlp import extract_entities, get_nlp
+from utils.placement_summary import placement_summary
+from utils.company_stats_snapshot import company_stats_snapshot
+from utils.bm25_index import insights_index
+from utils.company_resolver import company_resolver
+from services.company_insights_service import migrateLegacyCompanyInsightsOnStartup
+
+WARMUP_QUERY = "What is the TCS package for 2024?"
+
+readiness = {"ready": False, "error": None, "timings_ms": {}}
+
+async def _timed(component: str, fn):
+    started = time.perf_counter()
+    result = await fn() if inspect.iscoroutinefunction(fn) else await asyncio.to_thread(fn)
+    elapsed = round((time.perf_counter() - started) * 1000, 2)
+    readiness["timings_ms"][component] = elapsed
+    print(f"[INFO] Warm-up: {component} ready in {elapsed} ms")
+    return result
+
+async def _probe_answer_cache():
+    await get_cached_response(WARMUP_QUERY)
+
+async def warm_up():
+    try:
+        model = await _timed("embedding_model_load", get_embedding_model)
+        embedding = await _timed("embedding_model_encode", lambda: model.encode(WARMUP_QUERY).tolist())
+        await _timed("spacy_load", get_nlp)
+        await _timed("spacy_ner", lambda: extract_entities(WARMUP_QUERY))
+        for collection in (placement_stats_collection, company_stats_collection, company_insights_collection):
+            await _timed(f"chroma_{collection.name}", collection.count)
+        # Adds company_key/rounds_json to insights records stored before those fields existed
+        migrated = await _timed("insights_legacy_migration", migrateLegacyCompanyInsightsOnStartup)
+        if migrated:
+            print(f"[INFO] Migrated {migrated} legacy company insights record(s)")
+        # Stamps or verifies the embedding backend recorded on the insights collection
+        mismatch = await _timed("embedding_backend_check", lambda: check_collection_backend(company_insights_collection))
+        if mismatch:
+            readiness["embedding_mismatch"] = mismatch
+            print(f"[WARN] {mismatch}")
+        if await asyncio.to_thread(company_insights_collection.count) and not mismatch:
+            await _timed("chroma_query", lambda: company_insights_collection.query(
+                query_embeddings=[embedding], n_results=1
+            ))
+        await _timed("placement_summary", placement_summary.ensure_loaded)
+        await _timed("company_stats_snapshot", company_stats_snapshot.ensure_loaded)
+        await _timed("bm25_index", insights_index.ensure_loaded)
+        await _timed("company_resolver", company_resolver.ensure_loaded)
+        # Opens the Redis connection (if configured) ahead of the first chatbot query
+        await _timed("answer_cache", _probe_answer_cache)
+        readiness["ready"] = True
+        print(f"[INFO] Warm-up complete in {round(sum(readiness['timings_ms'].values()), 2)} ms")
+    except Exception as e:
+        readiness["error"] = str(e)
+        print(f"[WARN] Warm-up failed: {e}")